@@ -3,7 +3,7 @@ Manager Assistant class for coordinating multiple AI assistants.
 """
 
 import logging
-from typing import Dict, Any, AsyncGenerator, List, Optional
+from typing import Dict, Any, AsyncGenerator, List, Optional, Callable
 import json
 from ..core.base_agent import BaseAgent
 from ..assistants.configs.assistant_configs import get_all_assistants, get_assistant_config
@@ -19,6 +19,22 @@ from ..assistants.configs.manager_config import (
 
 logger = logging.getLogger(__name__)
 
+def _is_json(text: str) -> bool:
+    """Check that a model answer parses as JSON"""
+    try:
+        json.loads(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+def _is_score(text: str) -> bool:
+    """Check that a model answer is a bare numeric score"""
+    try:
+        float(text.strip())
+        return True
+    except ValueError:
+        return False
+
 class ManagerAssistant(BaseAgent):
     """Manager Assistant that coordinates other assistants based on query requirements."""
     
@@ -94,7 +110,10 @@ class ManagerAssistant(BaseAgent):
         response = await self.llm_call(
             analysis_prompt,
             temperature=0.3,
-            max_tokens=200
+            # Room for the whole JSON object; a truncated one fails _is_json
+            # and escalates through every cascade tier
+            max_tokens=1000,
+            accept=_is_json
         )
         
         try:
@@ -147,7 +166,8 @@ class ManagerAssistant(BaseAgent):
         analysis_response = await self.llm_call(
             analysis_prompt,
             temperature=0.3,
-            max_tokens=1000
+            max_tokens=1000,
+            accept=_is_json
         )
         
         try:
@@ -349,10 +369,11 @@ class ManagerAssistant(BaseAgent):
                     }
                 ],
                 temperature=temperature,
-                stream=True
+                stream=True,
+                raw=True
             ):
-                if chunk.get("type") == "response":
-                    yield {"type": "content", "content": chunk.get("content", "")}
+                if isinstance(chunk, str):
+                    yield {"type": "content", "content": chunk}
             
             yield {
                 "type": "thinking",
@@ -457,7 +478,8 @@ class ManagerAssistant(BaseAgent):
             score_response = await self.llm_call(
                 match_prompt,
                 temperature=0.3,
-                max_tokens=50
+                max_tokens=50,
+                accept=_is_score
             )
             return float(score_response.strip())
         except (ValueError, TypeError):
@@ -482,28 +504,15 @@ class ManagerAssistant(BaseAgent):
         temperature: float = 0.7,
         max_tokens: int = 1000,
         model_type: str = "reasoning",
-        model_category: str = "reasoning"
+        model_category: str = "reasoning",
+        accept: Optional[Callable[[str], bool]] = None
     ) -> str:
-        """Call the language model with a prompt and return the response."""
+        """Call the language model with a prompt and return the response.
+        
+        When accept is given, cheaper models are tried first and the call only
+        escalates to a stronger model if accept rejects the answer.
+        """
         try:
-            # Select appropriate model
-            model = None
-            provider = None
-            async for update in self.model_manager.select_model_with_progress(
-                query=prompt,
-                required_capabilities=["conversation"],
-                temperature=temperature
-            ):
-                if update.get("type") == "model_selected":
-                    model_info = update.get("model", {})
-                    model = model_info.get("name")
-                    provider = model_info.get("provider")
-                    break
-            
-            if not model or not provider:
-                raise ValueError("Failed to select model")
-            
-            # Prepare messages
             messages = [
                 {
                     "role": "system",
@@ -520,6 +529,27 @@ class ManagerAssistant(BaseAgent):
                 }
             ]
             
+            if accept:
+                response, _ = await self.model_manager.call_with_cascade(
+                    messages,
+                    required_capabilities=["conversation"],
+                    temperature=temperature,
+                    accept=accept,
+                    max_tokens=max_tokens,
+                    model_type=model_type,
+                    model_category=model_category
+                )
+                if not response:
+                    raise ValueError("No response received from model")
+                return response
+            
+            # Select appropriate model
+            model, provider = await self.model_manager.select_model_fast(
+                required_capabilities=["conversation"],
+                model_type=model_type,
+                model_category=model_category
+            )
+            
             # Get response
             response = None
             async for chunk in self.model_manager.call_with_tools(
@@ -527,16 +557,18 @@ class ManagerAssistant(BaseAgent):
                 provider=provider,
                 messages=messages,
                 temperature=temperature,
-                stream=False
+                stream=False,
+                raw=True,
+                max_tokens=max_tokens
             ):
-                if chunk.get("type") == "response":
+                if isinstance(chunk, str):
                     response = chunk
                     break
             
             if not response:
                 raise ValueError("No response received from model")
             
-            return response["content"]
+            return response
             
         except Exception as e:
             logger.error(f"Error in llm_call: {str(e)}")
@@ -685,12 +717,13 @@ class ManagerAssistant(BaseAgent):
                             }
                         ],
                         temperature=temperature,
-                        stream=True
+                        stream=True,
+                        raw=True
                     ):
-                        if chunk.get("type") == "response":
+                        if isinstance(chunk, str):
                             yield {
                                 "type": "content",
-                                "content": chunk.get("content", "")
+                                "content": chunk
                             }
 
                     yield {
@@ -14,6 +14,15 @@ import ssl
 
 logger = logging.getLogger(__name__)
 
+# Seconds before a SerpApi request is abandoned
+SERPAPI_TIMEOUT = 30
+
+# Largest SerpApi response body read; bigger responses are abandoned
+SERPAPI_MAX_BYTES = 4 * 1024 * 1024
+
+# SerpApi requests in flight at once per parallel_search call
+SERPAPI_CONCURRENCY = int(os.getenv("SERPAPI_CONCURRENCY", "8"))
+
 class SerpAgent(BaseAgent):
     """Advanced SERP agent for parallel web searches and comprehensive analysis."""
     
@@ -38,6 +47,10 @@ class SerpAgent(BaseAgent):
         if not self.serpapi_key:
             raise ValueError("SERP_API_KEY not found in environment variables and not provided to constructor")
         
+        # One HTTP session, and so one connection pool, for all searches;
+        # created on first use inside the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        
         # Search categories for different types of content
         self.search_categories = {
             "recent": {
@@ -97,10 +110,12 @@ Category:"""
                 {"role": "system", "content": "You are a search query analyzer. Respond only with the category name."},
                 {"role": "user", "content": intent_prompt}
             ],
-            stream=True
+            stream=True,
+            raw=True,
+            cache=True
         ):
-            if chunk.get("type") == "response":
-                intent_response += chunk.get("content", "")
+            if isinstance(chunk, str):
+                intent_response += chunk
         
         # Normalize the intent response
         primary_intent = intent_response.strip().lower()
@@ -168,50 +183,44 @@ Category:"""
             # Build URL with parameters
             url = f"https://serpapi.com/search.json?engine=google&q={encoded_query}&api_key={self.serpapi_key}"
             
-            # Configure SSL context
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE  # Only for development/testing
-            
-            # Configure client session with SSL context
-            conn = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=conn) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Extract organic results
-                        results = []
-                        if "organic_results" in data:
-                            for result in data["organic_results"][:5]:  # Limit to top 5 results
-                                snippet = {
-                                    "title": result.get("title", ""),
-                                    "link": result.get("link", ""),
-                                    "snippet": result.get("snippet", ""),
-                                    "date": result.get("date", "")
-                                }
-                                results.append(snippet)
-                        
-                        # Extract news results if available
-                        if "news_results" in data:
-                            for result in data["news_results"][:3]:  # Limit to top 3 news
-                                snippet = {
-                                    "title": result.get("title", ""),
-                                    "link": result.get("link", ""),
-                                    "snippet": result.get("snippet", ""),
-                                    "date": result.get("date", ""),
-                                    "source": result.get("source", "")
-                                }
-                                results.append(snippet)
-                        
-                        return {
-                            "query": query,
-                            "results": results
-                        }
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"SerpApi error: {error_text}")
-                        
+            session = self._get_session()
+            async with session.get(url) as response:
+                body = await self._read_capped(response, SERPAPI_MAX_BYTES)
+                if response.status == 200:
+                    data = json.loads(body)
+                    
+                    # Extract organic results
+                    results = []
+                    if "organic_results" in data:
+                        for result in data["organic_results"][:5]:  # Limit to top 5 results
+                            snippet = {
+                                "title": result.get("title", ""),
+                                "link": result.get("link", ""),
+                                "snippet": result.get("snippet", ""),
+                                "date": result.get("date", "")
+                            }
+                            results.append(snippet)
+                    
+                    # Extract news results if available
+                    if "news_results" in data:
+                        for result in data["news_results"][:3]:  # Limit to top 3 news
+                            snippet = {
+                                "title": result.get("title", ""),
+                                "link": result.get("link", ""),
+                                "snippet": result.get("snippet", ""),
+                                "date": result.get("date", ""),
+                                "source": result.get("source", "")
+                            }
+                            results.append(snippet)
+                    
+                    return {
+                        "query": query,
+                        "results": results
+                    }
+                else:
+                    error_text = body.decode("utf-8", errors="replace")
+                    raise Exception(f"SerpApi error: {error_text}")
+                    
         except Exception as e:
             logger.error(f"Error in serpapi_search: {str(e)}")
             return {
@@ -220,37 +229,121 @@ Category:"""
                 "error": str(e)
             }
 
-    async def parallel_search(self, queries: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
-        """Perform parallel web searches for multiple queries."""
-        try:
-            async def search_single_query(query: str, weight: float) -> Dict[str, Any]:
-                """Perform a single web search."""
-                # Determine time range based on query
-                time_range = None
-                for category, info in self.search_categories.items():
-                    if info["suffix"] in query.lower():
-                        time_range = info["time_range"]
-                        break
-                
-                # Perform search
-                search_result = await self.serpapi_search(query)
-                
-                return {
-                    "query": query,
-                    "weight": weight,
-                    "content": json.dumps(search_result["results"], indent=2)
-                }
+    @staticmethod
+    async def _read_capped(response: aiohttp.ClientResponse, max_bytes: int) -> bytes:
+        """Read a response body in chunks, giving up once it exceeds max_bytes.
+        
+        Raises:
+            ValueError: If the body is larger than max_bytes
+        """
+        if response.content_length is not None and response.content_length > max_bytes:
+            raise ValueError(f"Response of {response.content_length} bytes exceeds the {max_bytes} byte limit")
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ValueError(f"Response exceeds the {max_bytes} byte limit")
+        return bytes(body)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared SerpApi session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            # Configure SSL context
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE  # Only for development/testing
             
+            # Keep connections and DNS lookups alive between searches
+            conn = aiohttp.TCPConnector(
+                ssl=ssl_context,
+                limit=200,
+                limit_per_host=20,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=conn,
+                timeout=aiohttp.ClientTimeout(total=SERPAPI_TIMEOUT)
+            )
+        return self._session
+        
+    async def aclose(self) -> None:
+        """Close the SerpApi session and its pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _weighted_search(
+        self,
+        query: str,
+        weight: float,
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, Any]:
+        """Perform a single web search once the semaphore admits it."""
+        # Determine time range based on query
+        time_range = None
+        for category, info in self.search_categories.items():
+            if info["suffix"] in query.lower():
+                time_range = info["time_range"]
+                break
+        
+        # Perform search
+        async with semaphore:
+            search_result = await self.serpapi_search(query)
+        
+        return {
+            "query": query,
+            "weight": weight,
+            "content": json.dumps(search_result["results"], indent=2)
+        }
+
+    async def parallel_search(
+        self,
+        queries: List[Tuple[str, float]],
+        concurrency: int = SERPAPI_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """Perform parallel web searches for multiple queries.
+        
+        Args:
+            queries: (query, weight) pairs to search
+            concurrency: Most searches in flight at once; all of them share
+                the agent's HTTP session
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
             # Run searches in parallel
-            tasks = [search_single_query(query, weight) for query, weight in queries]
-            results = await asyncio.gather(*tasks)
-            
-            return results
-            
+            tasks = [self._weighted_search(query, weight, semaphore) for query, weight in queries]
+            return await asyncio.gather(*tasks)
         except Exception as e:
             logger.error(f"Error in parallel search: {str(e)}")
             return []
 
+    async def iter_search(
+        self,
+        queries: List[Tuple[str, float]],
+        concurrency: int = SERPAPI_CONCURRENCY
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Perform parallel web searches, yielding each result as it completes.
+        
+        Args:
+            queries: (query, weight) pairs to search
+            concurrency: Most searches in flight at once
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.ensure_future(self._weighted_search(query, weight, semaphore))
+            for query, weight in queries
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Stop outstanding searches if the caller stops early, and wait for
+            # them so none is left pending with an unretrieved exception
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def analyze_results(self, results: List[Dict[str, Any]], original_query: str) -> str:
         """Analyze and synthesize search results with weighted importance."""
         try:
@@ -303,10 +396,11 @@ Category:"""
                         "content": analysis_prompt
                     }
                 ],
-                stream=True
+                stream=True,
+                raw=True
             ):
-                if chunk.get("type") == "response":
-                    analysis_results.append(chunk.get("content", ""))
+                if isinstance(chunk, str):
+                    analysis_results.append(chunk)
             
             return "".join(analysis_results)
             
@@ -418,12 +512,13 @@ Category:"""
                         }
                     ],
                     temperature=temperature,
-                    stream=True
+                    stream=True,
+                    raw=True
                 ):
-                    if chunk.get("type") == "response":
+                    if isinstance(chunk, str):
                         yield {
                             "type": "content",
-                            "content": chunk.get("content", "")
+                            "content": chunk
                         }
                 
                 # Completion stage
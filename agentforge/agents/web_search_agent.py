@@ -73,10 +73,11 @@ class WebSearchAgent(BaseAgent):
                     "content": f"Search the web for: {query}"
                 }],
                 tools=[web_search_tool],
-                stream=True
+                stream=True,
+                raw=True
             ):
-                if chunk.get("type") == "response":
-                    search_results.append(chunk.get("content", ""))
+                if isinstance(chunk, str):
+                    search_results.append(chunk)
             
             raw_results = "".join(search_results)
             
@@ -106,10 +107,11 @@ class WebSearchAgent(BaseAgent):
                         "content": analysis_prompt
                     }
                 ],
-                stream=True
+                stream=True,
+                raw=True
             ):
-                if chunk.get("type") == "response":
-                    analysis_results.append(chunk.get("content", ""))
+                if isinstance(chunk, str):
+                    analysis_results.append(chunk)
             
             return "".join(analysis_results)
             
@@ -156,18 +158,20 @@ class WebSearchAgent(BaseAgent):
                 'Return only the search queries, one per line.'
             )
             
-            search_queries = []
+            # Streamed chunks are coalesced without regard to line breaks, so
+            # split the queries only once the whole response is in
+            query_chunks = []
             async for chunk in self.model_manager.call_with_tools(
                 model="gpt-4",
                 provider="openai",
                 messages=[{"role": "user", "content": search_prompt}],
                 tools=[web_search_tool],
-                stream=True
+                stream=True,
+                raw=True
             ):
-                if chunk.get("type") == "response":
-                    search_queries.extend(
-                        [q.strip() for q in chunk.get("content", "").split("\n") if q.strip()]
-                    )
+                if isinstance(chunk, str):
+                    query_chunks.append(chunk)
+            search_queries = [q.strip() for q in "".join(query_chunks).split("\n") if q.strip()]
 
             # Perform searches
             all_results = []
@@ -211,12 +215,13 @@ class WebSearchAgent(BaseAgent):
                     }
                 ],
                 temperature=temperature,
-                stream=True
+                stream=True,
+                raw=True
             ):
-                if chunk.get("type") == "response":
+                if isinstance(chunk, str):
                     yield {
                         "type": "content",
-                        "content": chunk.get("content", "")
+                        "content": chunk
                     }
 
             yield {
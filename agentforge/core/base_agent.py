@@ -1,9 +1,12 @@
+import logging
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional, List, AsyncGenerator
 from ..utils.model_manager import ModelManager
 from ..utils.document_manager import DocumentManager
 from ..assistants.configs.assistant_config import AssistantConfig
 
+logger = logging.getLogger(__name__)
+
 class BaseAgent(ABC):
     """Base class for all agents in the system."""
     
@@ -48,7 +51,7 @@ class BaseAgent(ABC):
             with open(self.config_path, 'r') as f:
                 self.config_content = f.read()
         except FileNotFoundError:
-            print(f"Warning: File {self.config_path} not found")
+            logger.warning("File %s not found", self.config_path)
             self.config_content = ""
             
     @abstractmethod
@@ -98,14 +101,13 @@ class BaseAgent(ABC):
                 model_category = "reasoning" if any(keyword in query.lower() for keyword in complex_keywords) else "cost-optimized"
 
             # Select appropriate model
-            model = self.model_manager.select_model(
-                task_type="general",
-                required_capabilities=["conversation"],
+            model_name, provider = await self.model_manager.select_model_fast(
                 preferred_model=preferred_model,
+                required_capabilities=["conversation"],
                 model_type=model_type,
-                model_category=model_category,
-                temperature=temperature
+                model_category=model_category
             )
+            model = {"name": model_name, "provider": provider, "temperature": temperature}
             
             # Prepare messages
             messages = [
@@ -124,15 +126,17 @@ class BaseAgent(ABC):
                 model=model,
                 messages=messages,
                 temperature=temperature,
-                stream=True
+                stream=True,
+                raw=True
             ):
+                is_text = isinstance(chunk, str)
                 yield {
-                    "type": chunk["type"],
-                    "content": chunk["content"],
+                    "type": "response" if is_text else chunk["type"],
+                    "content": chunk if is_text else chunk.get("content"),
                     "agent": self.name,
                     "model": model["name"],
-                    "model_type": model["type"],
-                    "model_category": model["category"],
+                    "model_type": model_type,
+                    "model_category": model_category,
                     "temperature": model.get("temperature")
                 }
                 
@@ -165,7 +169,7 @@ class BaseAgent(ABC):
                 for doc in docs
             ]
         except Exception as e:
-            print(f"Warning: Error querying documents: {str(e)}")
+            logger.warning("Error querying documents: %s", e)
             return []
             
     async def process_documents(self, dir_path: str) -> Dict[str, Any]:
@@ -176,7 +180,7 @@ class BaseAgent(ABC):
                 assistant_name=self.name
             )
         except Exception as e:
-            print(f"Warning: Error processing documents: {str(e)}")
+            logger.warning("Error processing documents: %s", e)
             return {
                 "processed": 0,
                 "unchanged": 0,
@@ -128,10 +128,12 @@ class BaseAssistant(BaseAgent):
             model=self.model,
             messages=messages,
             temperature=0.3,  # Lower temperature for more focused clarification check
-            stream=False
+            stream=False,
+            raw=True,
+            cache=True
         ):
-            if response["type"] == "response":
-                clarification_response += response["content"]
+            if isinstance(response, str):
+                clarification_response += response
 
         if "no clarification needed" in clarification_response.lower():
             return None
@@ -245,6 +247,7 @@ class BaseAssistant(BaseAgent):
                 provider=provider,
                 messages=context,
                 temperature=temperature,
+                raw=True,
                 **kwargs
             ):
                 if isinstance(chunk, dict):
@@ -1,5 +1,6 @@
 import os
-import json
+import asyncio
+import orjson
 import logging
 import traceback
 from typing import Optional, Dict, Any, List
@@ -10,6 +11,7 @@ from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 from .core.orchestrator import AgentOrchestrator
+from .utils.model_manager import close_http_client
 from agentforge.assistants.configs.assistant_configs import get_all_assistants
 
 # Set up logging
@@ -49,6 +51,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Open model API connections before the first request"""
+    managers = [
+        agent.model_manager for agent in orchestrator.agents.values()
+        if hasattr(agent, "model_manager")
+    ]
+    if not managers:
+        return
+        
+    # All model managers share one connection pool, so warming one is enough
+    await managers[0].prewarm()
+    
+    # Drop models the providers no longer serve without delaying startup; the
+    # listing is fetched once and shared through its cache
+    app.state.model_refresh = asyncio.ensure_future(asyncio.gather(
+        *[manager.refresh_available_models() for manager in managers],
+        return_exceptions=True
+    ))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled model and search API connections"""
+    for agent in orchestrator.agents.values():
+        if hasattr(agent, "aclose"):
+            await agent.aclose()
+    await close_http_client()
+
 class QueryRequest(BaseModel):
     text: str
     temperature: Optional[float] = Field(
@@ -99,7 +129,7 @@ async def stream_generator(query: str, temperature: float = 0.7, agent_name: Opt
                     'content': chunk.get('content', ''),
                     'details': chunk.get('details', {})
                 }
-                yield f"data: {json.dumps(data)}\n\n"
+                yield b"data: " + orjson.dumps(data) + b"\n\n"
                 
             elif chunk_type == "content":
                 data = {
@@ -107,7 +137,7 @@ async def stream_generator(query: str, temperature: float = 0.7, agent_name: Opt
                     'content': chunk.get('content', ''),
                     'agent': chunk.get('agent', None)
                 }
-                yield f"data: {json.dumps(data)}\n\n"
+                yield b"data: " + orjson.dumps(data) + b"\n\n"
                 
             elif chunk_type == "thinking":
                 data = {
@@ -115,14 +145,14 @@ async def stream_generator(query: str, temperature: float = 0.7, agent_name: Opt
                     'content': chunk.get('message', ''),
                     'details': chunk.get('details', {})
                 }
-                yield f"data: {json.dumps(data)}\n\n"
+                yield b"data: " + orjson.dumps(data) + b"\n\n"
                 
             elif chunk_type == "error":
                 data = {
                     'type': 'error',
                     'content': chunk.get('content', str(chunk.get('error', 'Unknown error')))
                 }
-                yield f"data: {json.dumps(data)}\n\n"
+                yield b"data: " + orjson.dumps(data) + b"\n\n"
                 
             elif chunk_type == "workflow":
                 data = {
@@ -130,19 +160,19 @@ async def stream_generator(query: str, temperature: float = 0.7, agent_name: Opt
                     'step': chunk.get('step', ''),
                     'content': chunk.get('content', '')
                 }
-                yield f"data: {json.dumps(data)}\n\n"
+                yield b"data: " + orjson.dumps(data) + b"\n\n"
                 
             else:
                 # For any other chunk types, pass through as is
-                yield f"data: {json.dumps(chunk)}\n\n"
+                yield b"data: " + orjson.dumps(chunk) + b"\n\n"
                 
         # Send completion message
-        yield f"data: {json.dumps({'type': 'done'})}\n\n"
+        yield b"data: " + orjson.dumps({'type': 'done'}) + b"\n\n"
         
     except Exception as e:
         logger.error(f"Error in stream_generator: {str(e)}")
         logger.error(traceback.format_exc())
-        yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+        yield b"data: " + orjson.dumps({'type': 'error', 'content': str(e)}) + b"\n\n"
 
 @app.post("/query")
 async def process_query(request: QueryRequest) -> Dict[str, Any]:
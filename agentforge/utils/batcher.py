@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+class AsyncBatcher:
+    """Groups concurrent submissions into one call of a batch coroutine.
+
+    A batch is sent once max_batch_size items are waiting or max_wait_s
+    after its first item arrived, whichever comes first. The batch function
+    takes the items in submission order and returns one result per item.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_s: float = 0.05
+    ):
+        """Create a batcher.
+
+        Args:
+            fn: Coroutine function mapping a list of items to their results
+            max_batch_size: Most items sent in one call
+            max_wait_s: Longest an item waits for others to join its batch
+        """
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Add an item to the next batch and wait for its result.
+
+        Raises:
+            Exception: Whatever the batch call raised, for every item in it
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._flush)
+        return await future
+
+    def _flush(self):
+        """Send the waiting items as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Call the batch function and hand each submitter its result"""
+        try:
+            results = await self.fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            # Don't leave submitters waiting on a batch that will never finish
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+
+        # Submitters that were cancelled meanwhile no longer want a result
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
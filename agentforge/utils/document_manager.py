@@ -1,7 +1,18 @@
+import io
 import os
-import json
+import csv
+import uuid
+import asyncio
 import hashlib
-from typing import Dict, Any, List, Optional
+import threading
+import weakref
+import docx2txt
+import pypdf
+from typing import Dict, Any, List, Optional, Tuple
+from aiolimiter import AsyncLimiter
+from openai import RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_community.document_loaders import (
@@ -12,16 +23,167 @@ from langchain_community.document_loaders import (
     UnstructuredImageLoader
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from .metadata_store import SqliteMetadata
+from .batcher import AsyncBatcher
+
+# Files up to this size are hashed from a single read
+SMALL_FILE_HASH_LIMIT = 8 * 1024 * 1024
+# Read buffer for hashing large files when hashlib.file_digest is unavailable
+HASH_BUFFER_SIZE = 2 * 1024 * 1024
+# Number of files hashed together while the next group is read ahead
+READAHEAD_BATCH_SIZE = 32
+# Rough characters-per-token ratio used to estimate embedding request size
+CHARS_PER_TOKEN = 4
+# Stored chunks read per page when adding missing metadata fields
+BACKFILL_PAGE_SIZE = 1000
+
+# Embedding request and token rate limiters per API key, shared by every
+# DocumentManager since the provider's quota is per account. Limiters belong
+# to one event loop, so each running loop gets its own
+_embedding_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Tuple[AsyncLimiter, AsyncLimiter]]]" = weakref.WeakKeyDictionary()
+
+def get_embedding_limits(
+    api_key: str,
+    requests_per_minute: int,
+    tokens_per_minute: int
+) -> Tuple[AsyncLimiter, AsyncLimiter]:
+    """Get the (request, token) rate limiters for an API key shared on the
+    running event loop; the rates given when they are first created apply"""
+    loop_limits = _embedding_limits.setdefault(asyncio.get_running_loop(), {})
+    limits = loop_limits.get(api_key)
+    if limits is None:
+        limits = (AsyncLimiter(requests_per_minute, 60), AsyncLimiter(tokens_per_minute, 60))
+        loop_limits[api_key] = limits
+    return limits
+
+def _prefetch_files(file_paths: List[str]):
+    """Ask the kernel to start reading files into the page cache.
+    
+    Uses posix_fadvise(POSIX_FADV_WILLNEED) where available (Linux) so the reads
+    for a whole batch are queued on the device at once; elsewhere it is a no-op.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+def _load_pdf_bytes(file_path: str, data: bytes) -> List[Document]:
+    """Load a PDF from memory, one document per page like PyPDFLoader"""
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return [
+        Document(page_content=page.extract_text(), metadata={"source": file_path, "page": index})
+        for index, page in enumerate(reader.pages)
+    ]
+
+def _load_docx_bytes(file_path: str, data: bytes) -> List[Document]:
+    """Load a Word document from memory like Docx2txtLoader"""
+    return [Document(page_content=docx2txt.process(io.BytesIO(data)), metadata={"source": file_path})]
+
+def _load_text_bytes(file_path: str, data: bytes) -> List[Document]:
+    """Load a text file from memory like TextLoader"""
+    return [Document(page_content=data.decode("utf-8"), metadata={"source": file_path})]
+
+def _load_csv_bytes(file_path: str, data: bytes) -> List[Document]:
+    """Load a CSV file from memory, one document per row like CSVLoader"""
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8"), newline=""))
+    return [
+        Document(
+            page_content="\n".join(
+                f"{key.strip() if key is not None else key}: {value.strip() if isinstance(value, str) else value}"
+                for key, value in row.items()
+            ),
+            metadata={"source": file_path, "row": index}
+        )
+        for index, row in enumerate(reader)
+    ]
+
+class IngestBuffer:
+    """Chunk texts and metadata waiting to be embedded and written in one batch.
+    
+    Texts and their metadata are kept as parallel lists, the shape both the
+    embeddings call and Chroma's collection add expect.
+    """
+    
+    def __init__(self, flush_threshold: int = 500):
+        self.flush_threshold = flush_threshold
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.pending_metadata: Dict[str, Dict[str, Any]] = {}
+        
+    def add(
+        self,
+        file_key: str,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        metadata: Dict[str, Any]
+    ):
+        """Queue a file's chunks and the metadata to record once they are stored"""
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self.pending_metadata[file_key] = metadata
+        
+    def is_full(self) -> bool:
+        """Check whether enough chunks are pending to warrant a flush"""
+        return len(self.texts) >= self.flush_threshold
+        
+    def take(self) -> Tuple[List[str], List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Remove and return all pending chunk texts, chunk metadata and file metadata"""
+        pending = (self.texts, self.metadatas, self.pending_metadata)
+        self.clear()
+        return pending
+        
+    def clear(self):
+        """Drop all pending chunks and metadata"""
+        self.texts = []
+        self.metadatas = []
+        self.pending_metadata = {}
 
 class DocumentManager:
     def __init__(
         self,
         base_path: str,
         openai_api_key: str,
-        collection_name: str = "agentforge"
+        collection_name: str = "agentforge",
+        flush_threshold: int = 500,
+        max_concurrent_writes: int = 4,
+        hash_workers: int = 4,
+        load_workers: int = 4,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        requests_per_minute: int = 3000,
+        tokens_per_minute: int = 1000000,
+        query_batch_size: int = 16,
+        query_batch_wait_ms: int = 20
     ):
         self.base_path = base_path
         self.collection_name = collection_name
+        self.ingest_buffer = IngestBuffer(flush_threshold=flush_threshold)
+        self.max_concurrent_writes = max_concurrent_writes
+        self.hash_workers = hash_workers
+        self.load_workers = load_workers
+        self._max_batch_size: Optional[int] = None
+        
+        # Keep embedding calls under the account's rate limits; the limiters
+        # are looked up per call (see get_embedding_limits)
+        self._openai_api_key = openai_api_key
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        
+        # Queries arriving together are embedded in one request
+        self._query_batcher = AsyncBatcher(
+            self._embed_documents,
+            max_batch_size=query_batch_size,
+            max_wait_s=query_batch_wait_ms / 1000
+        )
         self.metadata_file = os.path.join(base_path, "vectordb", f"{collection_name}_metadata.json")
         
         # Initialize embeddings and vector store
@@ -32,6 +194,12 @@ class DocumentManager:
             persist_directory=os.path.join(base_path, "vectordb")
         )
         
+        # Reuse one splitter for every file
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        
         # Initialize file type handlers
         self.file_handlers = {
             ".pdf": PyPDFLoader,
@@ -42,81 +210,334 @@ class DocumentManager:
             ".jpeg": UnstructuredImageLoader,
             ".png": UnstructuredImageLoader
         }
+        self.supported_extensions = frozenset(self.file_handlers)
         
-        # Load metadata
-        self.metadata = self._load_metadata()
+        # Loaders for file contents already read while hashing; images still
+        # go through their loader, which needs a path
+        self.bytes_handlers = {
+            ".pdf": _load_pdf_bytes,
+            ".docx": _load_docx_bytes,
+            ".txt": _load_text_bytes,
+            ".csv": _load_csv_bytes
+        }
         
-    def _load_metadata(self) -> Dict[str, Any]:
-        """Load metadata from file"""
-        try:
-            with open(self.metadata_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        # Load metadata; changes are collected and written once per batch of work
+        self.metadata = SqliteMetadata(
+            os.path.join(base_path, "vectordb", f"{collection_name}_metadata.sqlite3"),
+            legacy_json_path=self.metadata_file
+        )
+        self._metadata_updates: Dict[str, Dict[str, Any]] = {}
+        
+        # Chunks stored before file type filtering lack file_ext; unchanged
+        # files are never re-ingested, so it is added to them in place once,
+        # before the first query filtered by file type
+        self._file_ext_migrated = False
+        self._migration_lock = threading.Lock()
+        
+    def _migrate_file_ext(self):
+        """Backfill file_ext unless the migrations table records it as done.
+        
+        Scans the whole collection, so it runs in a worker thread; the lock
+        keeps concurrent first queries from scanning twice.
+        """
+        with self._migration_lock:
+            if self._file_ext_migrated:
+                return
+            if not self.metadata.has_migrated("chunk_file_ext"):
+                self._backfill_file_ext()
+                self.metadata.mark_migrated("chunk_file_ext")
+            self._file_ext_migrated = True
+        
+    def _backfill_file_ext(self):
+        """Add the file_ext metadata field to stored chunks missing it, taken
+        from their source path"""
+        collection = self.vectorstore._collection
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=BACKFILL_PAGE_SIZE, offset=offset)
+            if not page["ids"]:
+                break
+            ids = []
+            metadatas = []
+            for chunk_id, meta in zip(page["ids"], page["metadatas"]):
+                if meta and "file_ext" not in meta and meta.get("source"):
+                    ids.append(chunk_id)
+                    metadatas.append({**meta, "file_ext": os.path.splitext(meta["source"])[1].lower()})
+            if ids:
+                collection.update(ids=ids, metadatas=metadatas)
+            offset += len(page["ids"])
+        
+    async def _get_metadata(self, file_key: str) -> Optional[Dict[str, Any]]:
+        """Get a file's metadata, including changes not yet saved; stored
+        metadata is read off the event loop"""
+        if file_key in self._metadata_updates:
+            return self._metadata_updates[file_key]
+        return await asyncio.to_thread(self.metadata.get, file_key)
+        
+    async def _get_metadata_many(self, file_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the metadata of many files in one read off the event loop,
+        including changes not yet saved"""
+        stored = await asyncio.to_thread(
+            self.metadata.get_many,
+            [file_key for file_key in file_keys if file_key not in self._metadata_updates]
+        )
+        for file_key in file_keys:
+            if file_key in self._metadata_updates:
+                stored[file_key] = self._metadata_updates[file_key]
+        return stored
             
-    def _save_metadata(self):
-        """Save metadata to file"""
-        os.makedirs(os.path.dirname(self.metadata_file), exist_ok=True)
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
+    async def _save_metadata(self):
+        """Write pending metadata changes to the store in one transaction, off
+        the event loop"""
+        if not self._metadata_updates:
+            return
+        updates = self._metadata_updates
+        self._metadata_updates = {}
+        try:
+            await asyncio.to_thread(self.metadata.upsert_many, updates)
+        except Exception:
+            # Keep the changes for the next save; newer ones made meanwhile win
+            self._metadata_updates = {**updates, **self._metadata_updates}
+            raise
             
-    def _compute_file_hash(self, file_path: str) -> str:
-        """Compute SHA-256 hash of file contents"""
-        sha256_hash = hashlib.sha256()
+    def _read_and_hash(self, file_path: str) -> Tuple[Optional[bytes], str]:
+        """Compute SHA-256 hash of file contents, returning small files' bytes.
+        
+        Returns:
+            The file contents (None for files too large to keep in memory) and
+            the hex digest
+        """
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+            if os.fstat(f.fileno()).st_size <= SMALL_FILE_HASH_LIMIT:
+                data = f.read()
+                return data, hashlib.sha256(data).hexdigest()
+            
+            # Python 3.11+: hash in C without returning to the interpreter per block
+            if hasattr(hashlib, "file_digest"):
+                return None, hashlib.file_digest(f, "sha256").hexdigest()
+            
+            sha256_hash = hashlib.sha256()
+            buffer = bytearray(HASH_BUFFER_SIZE)
+            view = memoryview(buffer)
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                sha256_hash.update(view[:size])
+        return None, sha256_hash.hexdigest()
+        
+    @staticmethod
+    def _is_unchanged_on_disk(meta: Optional[Dict[str, Any]], file_stat: os.stat_result) -> bool:
+        """Check whether mtime and size still match the last processed version"""
+        return bool(meta) and (
+            meta.get("last_processed") == file_stat.st_mtime and
+            meta.get("size") == file_stat.st_size
+        )
+        
+    def _get_max_batch_size(self) -> int:
+        """Get (and cache) the largest batch Chroma accepts in a single add"""
+        if self._max_batch_size is None:
+            client = self.vectorstore._client
+            if hasattr(client, "get_max_batch_size"):
+                self._max_batch_size = client.get_max_batch_size()
+            else:
+                self._max_batch_size = getattr(client, "max_batch_size", 5000)
+        return self._max_batch_size
+        
+    async def _add_to_collection(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        texts: List[str]
+    ):
+        """Add precomputed embeddings to Chroma in sub-batches it can accept"""
+        max_batch = self._get_max_batch_size()
+        semaphore = asyncio.Semaphore(self.max_concurrent_writes)
+        
+        async def add_slice(start: int):
+            end = start + max_batch
+            async with semaphore:
+                await asyncio.to_thread(
+                    self.vectorstore._collection.add,
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    metadatas=metadatas[start:end],
+                    documents=texts[start:end]
+                )
+                
+        await asyncio.gather(*[
+            add_slice(start) for start in range(0, len(ids), max_batch)
+        ])
+        
+    @retry(
+        retry=retry_if_exception_type(RateLimitError),
+        wait=wait_exponential_jitter(max=60),
+        stop=stop_after_attempt(6),
+        reraise=True
+    )
+    async def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts within the request and token rate limits, backing off on 429s"""
+        token_estimate = sum(len(text) for text in texts) // CHARS_PER_TOKEN
+        request_limiter, token_limiter = get_embedding_limits(
+            self._openai_api_key, self.requests_per_minute, self.tokens_per_minute
+        )
+        await request_limiter.acquire()
+        await token_limiter.acquire(max(1, min(token_estimate, token_limiter.max_rate)))
+        return await self.embeddings.aembed_documents(texts)
+        
+    async def flush(self) -> int:
+        """Embed all buffered splits in one call and add them to the vector store.
+        
+        Metadata for the flushed files is updated in memory; await
+        _save_metadata() to persist it.
+        
+        Returns:
+            Number of chunks written
+        """
+        return await self._write_batch(*self.ingest_buffer.take())
+        
+    async def _write_batch(
+        self,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        pending_metadata: Dict[str, Dict[str, Any]]
+    ) -> int:
+        """Embed and store a batch of chunks, then record its files' metadata"""
+        if not texts:
+            self._metadata_updates.update(pending_metadata)
+            return 0
+            
+        ids = [str(uuid.uuid4()) for _ in texts]
+        
+        embeddings = await self._get_embeddings(texts)
+        await self._add_to_collection(ids, embeddings, metadatas, texts)
+        
+        # Only record files as processed once their chunks are stored
+        self._metadata_updates.update(pending_metadata)
+        
+        return len(texts)
+        
+    async def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached embeddings for chunks seen before.
+        
+        Chunks are keyed by a hash of the embedding model and their content, so
+        boilerplate repeated across files is embedded once. Everything not
+        cached is embedded in one batch instead of letting Chroma embed per
+        document.
+        """
+        model = getattr(self.embeddings, "model", "")
+        chunk_hashes = [
+            hashlib.blake2b(f"{model}\0{text}".encode(), digest_size=16).digest()
+            for text in texts
+        ]
+        embeddings = await asyncio.to_thread(self.metadata.get_embeddings, set(chunk_hashes))
+        
+        missing = {}
+        for chunk_hash, text in zip(chunk_hashes, texts):
+            if chunk_hash not in embeddings:
+                missing.setdefault(chunk_hash, text)
+        if missing:
+            new_embeddings = dict(zip(
+                missing,
+                await self._embed_documents(list(missing.values()))
+            ))
+            await asyncio.to_thread(self.metadata.put_embeddings, new_embeddings)
+            embeddings.update(new_embeddings)
+            
+        return [embeddings[chunk_hash] for chunk_hash in chunk_hashes]
+        
+    def _load_and_split(
+        self,
+        file_ext: str,
+        file_path: str,
+        file_data: Optional[bytes] = None
+    ) -> List[Document]:
+        """Load a file and split it into chunks, parsing file_data if given
+        instead of reading the file again"""
+        if file_data is not None and file_ext in self.bytes_handlers:
+            documents = self.bytes_handlers[file_ext](file_path, file_data)
+        else:
+            documents = self.file_handlers[file_ext](file_path).load()
+        return self.text_splitter.split_documents(documents)
         
     async def process_file(
         self,
         file_path: str,
-        assistant_name: str
+        assistant_name: str,
+        defer_flush: bool = False,
+        file_hash: Optional[str] = None,
+        file_ext: Optional[str] = None,
+        file_data: Optional[bytes] = None
     ) -> Dict[str, Any]:
-        """Process a single file and add to vector store"""
+        """Process a single file and add to vector store.
+        
+        With defer_flush the chunks stay buffered until flush() is called, so
+        many small files share one embedding batch. A precomputed file_hash
+        skips hashing the file again, and file_data read along with it is
+        parsed instead of re-reading the file. A file_ext already checked
+        against supported_extensions skips the type check.
+        """
         try:
             # Check if file type is supported
-            file_ext = os.path.splitext(file_path)[1].lower()
-            if file_ext not in self.file_handlers:
+            if file_ext is None:
+                file_ext = os.path.splitext(file_path)[1].lower()
+            if file_ext not in self.supported_extensions:
                 return {
                     "status": "error",
                     "error": f"Unsupported file type: {file_ext}"
                 }
                 
-            # Check if file has changed
-            file_hash = self._compute_file_hash(file_path)
+            # Check if file has changed, trusting mtime and size before hashing
             file_key = f"{assistant_name}:{file_path}"
-            
-            if file_key in self.metadata and self.metadata[file_key]["hash"] == file_hash:
+            file_stat = os.stat(file_path)
+            meta = await self._get_metadata(file_key)
+            if self._is_unchanged_on_disk(meta, file_stat):
                 return {
                     "status": "unchanged",
                     "message": "File unchanged since last processing"
                 }
                 
-            # Load and split document
-            loader = self.file_handlers[file_ext](file_path)
-            documents = loader.load()
-            
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            splits = text_splitter.split_documents(documents)
-            
-            # Add assistant name to metadata
-            for split in splits:
-                split.metadata["assistant"] = assistant_name
+            if file_hash is None:
+                file_data, file_hash = await asyncio.to_thread(self._read_and_hash, file_path)
             
-            # Add to vector store
-            self.vectorstore.add_documents(splits)
+            if meta and meta["hash"] == file_hash:
+                # Remember the new mtime/size so the next scan can skip hashing
+                self._metadata_updates[file_key] = {
+                    **meta,
+                    "last_processed": file_stat.st_mtime,
+                    "size": file_stat.st_size
+                }
+                if not defer_flush:
+                    await self._save_metadata()
+                return {
+                    "status": "unchanged",
+                    "message": "File unchanged since last processing"
+                }
+                
+            # Load and split document off the event loop
+            splits = await asyncio.to_thread(self._load_and_split, file_ext, file_path, file_data)
             
-            # Update metadata
-            self.metadata[file_key] = {
+            # Add assistant name and file type to chunk metadata for filtered
+            # queries; file metadata is recorded once the chunks are stored
+            texts = [split.page_content for split in splits]
+            metadatas = [
+                {**split.metadata, "assistant": assistant_name, "file_ext": file_ext}
+                for split in splits
+            ]
+            file_metadata = {
                 "hash": file_hash,
-                "last_processed": os.path.getmtime(file_path),
+                "last_processed": file_stat.st_mtime,
+                "size": file_stat.st_size,
                 "num_chunks": len(splits)
             }
-            self._save_metadata()
+            if defer_flush:
+                self.ingest_buffer.add(file_key, texts, metadatas, file_metadata)
+            else:
+                # Write only this file's chunks; the shared buffer may hold
+                # chunks a concurrent directory run accounts for on its flush
+                await self._write_batch(texts, metadatas, {file_key: file_metadata})
+                await self._save_metadata()
             
             return {
                 "status": "success",
@@ -134,7 +555,12 @@ class DocumentManager:
         dir_path: str,
         assistant_name: str
     ) -> Dict[str, Any]:
-        """Process all supported files in directory"""
+        """Process all supported files in directory.
+        
+        Files move through bounded queues so the stages overlap: hash workers
+        feed load workers, which load and split files into the ingest buffer
+        and hand each full batch to a single writer that embeds and stores it.
+        """
         stats = {
             "processed": 0,
             "unchanged": 0,
@@ -142,10 +568,73 @@ class DocumentManager:
             "error_files": []
         }
         
+        # Skip unsupported files during the walk, before building their paths
+        supported = self.supported_extensions
+        file_paths = []
+        file_exts = {}
         for root, _, files in os.walk(dir_path):
             for file in files:
+                file_ext = os.path.splitext(file)[1].lower()
+                if file_ext not in supported:
+                    continue
                 file_path = os.path.join(root, file)
-                result = await self.process_file(file_path, assistant_name)
+                file_paths.append(file_path)
+                file_exts[file_path] = file_ext
+        
+        # Only hash files whose mtime and size show they may have changed,
+        # reading the metadata of every file in one query
+        known = await self._get_metadata_many([f"{assistant_name}:{file_path}" for file_path in file_paths])
+        hashable = set()
+        for file_path in file_paths:
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                continue
+            if not self._is_unchanged_on_disk(known.get(f"{assistant_name}:{file_path}"), file_stat):
+                hashable.add(file_path)
+        
+        path_queue = asyncio.Queue(maxsize=READAHEAD_BATCH_SIZE)
+        load_queue = asyncio.Queue(maxsize=self.load_workers * 2)
+        # One batch waits while another is written, bounding buffered chunks
+        write_queue = asyncio.Queue(maxsize=1)
+        
+        async def queue_paths():
+            # Read ahead each batch while the previous one is being hashed
+            for start in range(0, len(file_paths), READAHEAD_BATCH_SIZE):
+                batch = file_paths[start:start + READAHEAD_BATCH_SIZE]
+                await asyncio.to_thread(
+                    _prefetch_files,
+                    [file_path for file_path in batch if file_path in hashable]
+                )
+                for file_path in batch:
+                    await path_queue.put(file_path)
+            for _ in range(self.hash_workers):
+                await path_queue.put(None)
+                
+        async def hash_files():
+            while (file_path := await path_queue.get()) is not None:
+                file_data, file_hash = None, None
+                if file_path in hashable:
+                    try:
+                        file_data, file_hash = await asyncio.to_thread(self._read_and_hash, file_path)
+                    except Exception as e:
+                        file_hash = e
+                await load_queue.put((file_path, file_hash, file_data))
+                
+        async def load_files():
+            while (item := await load_queue.get()) is not None:
+                file_path, file_hash, file_data = item
+                if isinstance(file_hash, Exception):
+                    result = {"status": "error", "error": str(file_hash)}
+                else:
+                    result = await self.process_file(
+                        file_path,
+                        assistant_name,
+                        defer_flush=True,
+                        file_hash=file_hash,
+                        file_ext=file_exts[file_path],
+                        file_data=file_data
+                    )
                 
                 if result["status"] == "success":
                     stats["processed"] += 1
@@ -158,8 +647,53 @@ class DocumentManager:
                         "error": result.get("error", "Unknown error")
                     })
                     
+                if self.ingest_buffer.is_full():
+                    await write_queue.put(self.ingest_buffer.take())
+                    
+        async def write_batches():
+            while (batch := await write_queue.get()) is not None:
+                await self._flush_batch(stats, *batch)
+        
+        writer = asyncio.create_task(write_batches())
+        hashers = [asyncio.create_task(hash_files()) for _ in range(self.hash_workers)]
+        loaders = [asyncio.create_task(load_files()) for _ in range(self.load_workers)]
+        try:
+            await asyncio.gather(queue_paths(), *hashers)
+            for _ in range(self.load_workers):
+                await load_queue.put(None)
+            await asyncio.gather(*loaders)
+            
+            # Write whatever is still buffered, then persist metadata once
+            await write_queue.put(self.ingest_buffer.take())
+            await write_queue.put(None)
+            await writer
+        finally:
+            for task in [writer, *hashers, *loaders]:
+                if not task.done():
+                    task.cancel()
+        await self._save_metadata()
+                    
         return stats
         
+    async def _flush_batch(
+        self,
+        stats: Dict[str, Any],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        pending_metadata: Dict[str, Dict[str, Any]]
+    ):
+        """Write a batch, moving its files to errors if the write fails"""
+        try:
+            await self._write_batch(texts, metadatas, pending_metadata)
+        except Exception as e:
+            for file_key in pending_metadata:
+                stats["processed"] -= 1
+                stats["errors"] += 1
+                stats["error_files"].append({
+                    "file": file_key.partition(":")[2],
+                    "error": str(e)
+                })
+        
     async def query_documents(
         self,
         query: str,
@@ -168,22 +702,33 @@ class DocumentManager:
         num_results: int = 5
     ) -> List[Any]:
         """Query vector store for relevant documents"""
-        # Prepare filter based on assistant name and file types
-        filter_dict = {}
+        # Prepare filter based on assistant name and file types, using equality
+        # checks on stored metadata so Chroma can prefilter
+        conditions = []
         if assistant_name:
-            filter_dict["assistant"] = assistant_name
+            conditions.append({"assistant": assistant_name})
             
         if file_types:
-            filter_dict["source"] = {
-                "$or": [
-                    {"$endswith": ext}
+            if not self._file_ext_migrated:
+                await asyncio.to_thread(self._migrate_file_ext)
+            # Stored extensions are lowercase with a leading dot
+            conditions.append({
+                "file_ext": {"$in": [
+                    ext.lower() if ext.startswith(".") else f".{ext.lower()}"
                     for ext in file_types
-                ]
-            }
+                ]}
+            })
+            
+        if len(conditions) > 1:
+            filter_dict = {"$and": conditions}
+        else:
+            filter_dict = conditions[0] if conditions else {}
             
         # Query vector store
-        docs = self.vectorstore.similarity_search(
-            query,
+        query_embedding = await self._query_batcher.submit(query)
+        docs = await asyncio.to_thread(
+            self.vectorstore.similarity_search_by_vector,
+            query_embedding,
             k=num_results,
             filter=filter_dict if filter_dict else None
         )
@@ -191,37 +736,16 @@ class DocumentManager:
         return docs
         
     def get_stats(self) -> Dict[str, Any]:
-        """Get statistics about processed documents"""
-        stats = {
-            "total_files": len(self.metadata),
-            "total_chunks": sum(
-                meta["num_chunks"]
-                for meta in self.metadata.values()
-            ),
-            "by_assistant": {},
-            "by_type": {}
-        }
+        """Get statistics about processed documents.
         
-        for file_key, meta in self.metadata.items():
-            assistant = file_key.split(":")[0]
-            file_type = os.path.splitext(file_key.split(":")[1])[1]
-            
-            # Update assistant stats
-            if assistant not in stats["by_assistant"]:
-                stats["by_assistant"][assistant] = {
-                    "files": 0,
-                    "chunks": 0
-                }
-            stats["by_assistant"][assistant]["files"] += 1
-            stats["by_assistant"][assistant]["chunks"] += meta["num_chunks"]
-            
-            # Update file type stats
-            if file_type not in stats["by_type"]:
-                stats["by_type"][file_type] = {
-                    "files": 0,
-                    "chunks": 0
-                }
-            stats["by_type"][file_type]["files"] += 1
-            stats["by_type"][file_type]["chunks"] += meta["num_chunks"]
-            
-        return stats 
\ No newline at end of file
+        Reads SQLite on the calling thread; use aget_stats from async code.
+        """
+        if self._metadata_updates:
+            self.metadata.upsert_many(self._metadata_updates)
+            self._metadata_updates = {}
+        return self.metadata.stats()
+        
+    async def aget_stats(self) -> Dict[str, Any]:
+        """Get statistics about processed documents without blocking the event loop"""
+        await self._save_metadata()
+        return await asyncio.to_thread(self.metadata.stats)
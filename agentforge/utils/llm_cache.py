@@ -0,0 +1,70 @@
+import hashlib
+import orjson
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Union
+
+Chunk = Union[str, Dict[str, Any]]
+
+class LLMCache:
+    """Exact-match cache of complete model responses, evicting the least
+    recently used entries"""
+
+    def __init__(self, max_size: int = 256):
+        """Create an empty cache.
+
+        Args:
+            max_size: Number of responses kept
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, List[Chunk]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model_name: str,
+        messages: Optional[List[Dict[str, str]]],
+        tools: Optional[List[Dict[str, Any]]],
+        temperature: Optional[float],
+        stream: bool,
+        max_tokens: Optional[int] = None,
+        stop_sequences: Optional[List[str]] = None
+    ) -> str:
+        """Hash everything that determines a call's response"""
+        payload = orjson.dumps(
+            {
+                "p": provider,
+                "m": model_name,
+                "msgs": messages,
+                "tools": tools,
+                "t": temperature,
+                "s": stream,
+                "mt": max_tokens,
+                "stop": stop_sequences
+            },
+            default=str,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        )
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    async def lookup(self, key: str) -> Optional[List[Chunk]]:
+        """Get the cached chunks for a key, or None on a miss"""
+        chunks = self._entries.get(key)
+        if chunks is not None:
+            self._entries.move_to_end(key)
+        return chunks
+
+    async def put(self, key: str, chunks: List[Chunk]) -> None:
+        """Cache a complete response; responses containing an error are skipped"""
+        if any(isinstance(chunk, dict) and chunk.get("type") == "error" for chunk in chunks):
+            return
+        self._entries[key] = chunks
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Drop every cached response"""
+        self._entries.clear()
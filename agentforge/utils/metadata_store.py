@@ -0,0 +1,273 @@
+import os
+import time
+import sqlite3
+import threading
+from array import array
+import orjson
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional
+
+# Stay under SQLite's default limit on bound parameters per statement
+MAX_QUERY_PARAMS = 500
+# Cached chunk embeddings kept; the least recently used beyond this are pruned
+MAX_CACHED_EMBEDDINGS = 50000
+
+class SqliteMetadata:
+    """Per-file processing metadata and cached chunk embeddings for
+    DocumentManager, stored in SQLite.
+
+    DocumentManager calls it from worker threads, so every method takes a
+    lock around its use of the shared connection. A read then never runs
+    inside another thread's open transaction.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        legacy_json_path: Optional[str] = None,
+        max_embeddings: int = MAX_CACHED_EMBEDDINGS
+    ):
+        """Open (and create if needed) the metadata database.
+
+        Args:
+            db_path: Path to the SQLite database file
+            legacy_json_path: JSON metadata file imported when the database is new
+            max_embeddings: Cached chunk embeddings kept before the least
+                recently used are pruned
+        """
+        self.db_path = db_path
+        self.max_embeddings = max_embeddings
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        is_new = not os.path.exists(db_path)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_metadata (
+                file_key TEXT PRIMARY KEY,
+                assistant TEXT NOT NULL,
+                file_ext TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                last_processed REAL,
+                size INTEGER,
+                num_chunks INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunk_embeddings (
+                chunk_hash BLOB PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                last_used REAL NOT NULL DEFAULT 0
+            )
+        """)
+        # Databases created before pruning lack the last_used column
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(chunk_embeddings)")}
+        if "last_used" not in columns:
+            self.conn.execute("ALTER TABLE chunk_embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS chunk_embeddings_last_used ON chunk_embeddings (last_used)"
+        )
+        # One-time data migrations already applied, by name
+        self.conn.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY)")
+        self.conn.commit()
+        self._embedding_count = self.conn.execute("SELECT COUNT(*) FROM chunk_embeddings").fetchone()[0]
+
+        if is_new and legacy_json_path and os.path.exists(legacy_json_path):
+            self._import_json(legacy_json_path)
+
+    @staticmethod
+    def _split_file_key(file_key: str):
+        """Split an "assistant:path" key into the assistant and file extension"""
+        assistant, _, file_path = file_key.partition(":")
+        return assistant, os.path.splitext(file_path)[1]
+
+    def _import_json(self, json_path: str):
+        """Import metadata written by the previous JSON-file store"""
+        with open(json_path, 'rb') as f:
+            self.upsert_many(orjson.loads(f.read()))
+
+    def get(self, file_key: str) -> Optional[Dict[str, Any]]:
+        """Get metadata for a file key, or None if it was never processed"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT hash, last_processed, size, num_chunks FROM file_metadata WHERE file_key = ?",
+                (file_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "hash": row[0],
+            "last_processed": row[1],
+            "size": row[2],
+            "num_chunks": row[3]
+        }
+
+    def get_many(self, file_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Get metadata for the file keys that were processed, in one query
+        per MAX_QUERY_PARAMS keys"""
+        file_keys = list(file_keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(file_keys), MAX_QUERY_PARAMS):
+                batch = file_keys[start:start + MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                for file_key, file_hash, last_processed, size, num_chunks in self.conn.execute(
+                    "SELECT file_key, hash, last_processed, size, num_chunks "
+                    f"FROM file_metadata WHERE file_key IN ({placeholders})",
+                    batch
+                ):
+                    found[file_key] = {
+                        "hash": file_hash,
+                        "last_processed": last_processed,
+                        "size": size,
+                        "num_chunks": num_chunks
+                    }
+        return found
+
+    def __contains__(self, file_key: str) -> bool:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT 1 FROM file_metadata WHERE file_key = ?",
+                (file_key,)
+            ).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM file_metadata").fetchone()[0]
+
+    def upsert_many(self, rows: Dict[str, Dict[str, Any]]):
+        """Insert or update metadata for many files in one transaction.
+
+        Args:
+            rows: Mapping of file key to its metadata
+        """
+        if not rows:
+            return
+        params = []
+        for file_key, meta in rows.items():
+            assistant, file_ext = self._split_file_key(file_key)
+            params.append((
+                file_key,
+                assistant,
+                file_ext,
+                meta["hash"],
+                meta.get("last_processed"),
+                meta.get("size"),
+                meta.get("num_chunks", 0)
+            ))
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO file_metadata
+                    (file_key, assistant, file_ext, hash, last_processed, size, num_chunks)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(file_key) DO UPDATE SET
+                    hash = excluded.hash,
+                    last_processed = excluded.last_processed,
+                    size = excluded.size,
+                    num_chunks = excluded.num_chunks
+            """, params)
+
+    def get_embeddings(self, chunk_hashes: Iterable[bytes]) -> Dict[bytes, List[float]]:
+        """Get cached embeddings for the chunk hashes that have one, marking
+        them as recently used"""
+        chunk_hashes = list(chunk_hashes)
+        found = {}
+        with self._lock:
+            for start in range(0, len(chunk_hashes), MAX_QUERY_PARAMS):
+                batch = chunk_hashes[start:start + MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                for chunk_hash, embedding in self.conn.execute(
+                    f"SELECT chunk_hash, embedding FROM chunk_embeddings WHERE chunk_hash IN ({placeholders})",
+                    batch
+                ):
+                    found[chunk_hash] = array("f", embedding).tolist()
+            if found:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE chunk_embeddings SET last_used = ? WHERE chunk_hash = ?",
+                        [(now, chunk_hash) for chunk_hash in found]
+                    )
+        return found
+
+    def put_embeddings(self, embeddings: Dict[bytes, List[float]]):
+        """Cache embeddings by chunk hash in one transaction, then prune the
+        least recently used beyond max_embeddings.
+
+        Args:
+            embeddings: Mapping of chunk hash to its embedding
+        """
+        if not embeddings:
+            return
+        now = time.time()
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO chunk_embeddings (chunk_hash, embedding, last_used) VALUES (?, ?, ?)",
+                    [
+                        (chunk_hash, array("f", embedding).tobytes(), now)
+                        for chunk_hash, embedding in embeddings.items()
+                    ]
+                )
+            # Callers only store embeddings that were missing, so rows are new
+            self._embedding_count += len(embeddings)
+            if self._embedding_count > self.max_embeddings:
+                self.prune_embeddings()
+
+    def prune_embeddings(self):
+        """Delete the least recently used cached embeddings beyond max_embeddings"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM chunk_embeddings WHERE chunk_hash IN ("
+                "SELECT chunk_hash FROM chunk_embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_embeddings,)
+            )
+            self._embedding_count = self.conn.execute("SELECT COUNT(*) FROM chunk_embeddings").fetchone()[0]
+
+    def has_migrated(self, name: str) -> bool:
+        """Check whether a named one-time migration was already applied"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT 1 FROM migrations WHERE name = ?",
+                (name,)
+            ).fetchone() is not None
+
+    def mark_migrated(self, name: str):
+        """Record a named one-time migration as applied"""
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO migrations (name) VALUES (?)", (name,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get file and chunk counts overall, per assistant and per file type"""
+        total_files = 0
+        total_chunks = 0
+        by_assistant = defaultdict(lambda: {"files": 0, "chunks": 0})
+        by_type = defaultdict(lambda: {"files": 0, "chunks": 0})
+
+        # One aggregation pass; the (assistant, type) groups are few
+        with self._lock:
+            groups = self.conn.execute(
+                "SELECT assistant, file_ext, COUNT(*), COALESCE(SUM(num_chunks), 0) "
+                "FROM file_metadata GROUP BY assistant, file_ext"
+            ).fetchall()
+        for assistant, file_ext, files, chunks in groups:
+            total_files += files
+            total_chunks += chunks
+            by_assistant[assistant]["files"] += files
+            by_assistant[assistant]["chunks"] += chunks
+            by_type[file_ext]["files"] += files
+            by_type[file_ext]["chunks"] += chunks
+
+        return {
+            "total_files": total_files,
+            "total_chunks": total_chunks,
+            "by_assistant": dict(by_assistant),
+            "by_type": dict(by_type)
+        }
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,203 @@
+import os
+import time
+import asyncio
+import logging
+import weakref
+import orjson
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True, frozen=True)
+class ModelSpec:
+    """A model known to the ModelManager.
+
+    Attributes:
+        name: Model name as passed to the provider
+        provider: "openai" or "anthropic"
+        model_type: Kind of model, e.g. "chat"
+        category: Model family used for filtering
+        capabilities: Tasks the model handles well
+        priority: Selection order, lowest first
+        cost: Relative price (USD per million input tokens), used to order
+            cascades cheapest first; unknown models sort last
+    """
+    name: str
+    provider: str
+    model_type: str
+    category: str
+    capabilities: frozenset
+    priority: int = 999
+    cost: float = 999.0
+
+
+# Built-in registry, used unless AGENTFORGE_MODELS_PATH points at a catalog file
+DEFAULT_MODELS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "openai": {
+        "gpt-4": {
+            "model_type": "chat",
+            "category": "openai",
+            "capabilities": ["conversation", "analysis", "creation"],
+            "priority": 0,
+            "cost": 30.0
+        },
+        "gpt-3.5-turbo": {
+            "model_type": "chat",
+            "category": "openai",
+            "capabilities": ["conversation", "analysis"],
+            "priority": 2,
+            "cost": 0.5
+        }
+    },
+    "anthropic": {
+        "claude-2": {
+            "model_type": "chat",
+            "category": "anthropic",
+            "capabilities": ["conversation", "analysis", "creation"],
+            "priority": 1,
+            "cost": 8.0
+        },
+        "claude-instant-1": {
+            "model_type": "chat",
+            "category": "anthropic",
+            "capabilities": ["conversation"],
+            "priority": 3,
+            "cost": 0.8
+        }
+    }
+}
+
+def _build_specs(catalog: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, ModelSpec]]:
+    """Turn a provider -> model name -> attributes mapping into ModelSpecs"""
+    return {
+        provider: {
+            name: ModelSpec(
+                name=name,
+                provider=provider,
+                model_type=attrs.get("model_type", "chat"),
+                category=attrs.get("category", provider),
+                capabilities=frozenset(attrs.get("capabilities", ())),
+                priority=attrs.get("priority", 999),
+                cost=attrs.get("cost", 999.0)
+            )
+            for name, attrs in models.items()
+        }
+        for provider, models in catalog.items()
+    }
+
+def load_catalog() -> Dict[str, Dict[str, ModelSpec]]:
+    """Load the model registry.
+
+    When AGENTFORGE_MODELS_PATH is set, the registry is read from that JSON
+    file (same shape as DEFAULT_MODELS); an unreadable file falls back to
+    the built-in defaults.
+    """
+    path = os.environ.get("AGENTFORGE_MODELS_PATH")
+    if path:
+        try:
+            with open(path, 'rb') as f:
+                return _build_specs(orjson.loads(f.read()))
+        except (OSError, orjson.JSONDecodeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable model catalog {path}: {str(e)}")
+    return _build_specs(DEFAULT_MODELS)
+
+
+# Provider model listings are cached in memory and on disk for this long.
+# The disk cache holds one <provider>.json file per provider and a
+# .last_sync marker whose mtime is the time of the last successful listing
+MODEL_LIST_TTL = 24 * 3600
+MODEL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".agentforge", "cache")
+_model_list_cache: Optional[Tuple[float, Dict[str, List[str]]]] = None
+# asyncio locks belong to one event loop, so each running loop gets its own
+_model_list_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+def remote_models_disabled() -> bool:
+    """Whether AGENTFORGE_DISABLE_REMOTE_MODELS forbids listing models over the network"""
+    return os.environ.get("AGENTFORGE_DISABLE_REMOTE_MODELS", "").lower() in ("1", "true", "yes")
+
+def _read_listing_cache() -> Tuple[float, Dict[str, List[str]]]:
+    """Read the cached listings from MODEL_CACHE_DIR, with the time of the
+    last sync (0 when there is none)"""
+    try:
+        synced_at = os.path.getmtime(os.path.join(MODEL_CACHE_DIR, ".last_sync"))
+    except OSError:
+        synced_at = 0.0
+    listings = {}
+    try:
+        file_names = os.listdir(MODEL_CACHE_DIR)
+    except OSError:
+        return synced_at, listings
+    for file_name in file_names:
+        provider, ext = os.path.splitext(file_name)
+        if ext != ".json":
+            continue
+        try:
+            with open(os.path.join(MODEL_CACHE_DIR, file_name), 'rb') as f:
+                listings[provider] = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable model list cache {file_name}: {str(e)}")
+    return synced_at, listings
+
+def _write_listing_cache(listings: Dict[str, List[str]]) -> None:
+    """Write fetched listings to MODEL_CACHE_DIR and mark the sync time"""
+    try:
+        os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+        for provider, model_ids in listings.items():
+            path = os.path.join(MODEL_CACHE_DIR, f"{provider}.json")
+            with open(f"{path}.tmp", 'wb') as f:
+                f.write(orjson.dumps(model_ids))
+            os.replace(f"{path}.tmp", path)
+        with open(os.path.join(MODEL_CACHE_DIR, ".last_sync"), 'wb'):
+            pass
+    except OSError as e:
+        logger.warning(f"Could not write model list cache: {str(e)}")
+
+async def list_provider_models(clients: Dict[str, Any]) -> Dict[str, List[str]]:
+    """List the model ids each provider currently serves.
+
+    Listings younger than MODEL_LIST_TTL are reused from memory or from
+    MODEL_CACHE_DIR, so a new process does not list again. Older listings
+    are refreshed, but a provider whose refresh fails keeps its stale
+    listing; one with no listing at all is left out, so its models are not
+    treated as unavailable. With AGENTFORGE_DISABLE_REMOTE_MODELS set, only
+    cached listings are used. Cache files are read and written in a worker
+    thread.
+
+    Args:
+        clients: Provider name to SDK client, for the providers to list
+    """
+    global _model_list_cache
+    loop = asyncio.get_running_loop()
+    lock = _model_list_locks.get(loop)
+    if lock is None:
+        lock = _model_list_locks[loop] = asyncio.Lock()
+
+    async with lock:
+        if _model_list_cache is None:
+            _model_list_cache = await asyncio.to_thread(_read_listing_cache)
+
+        now = time.time()
+        synced_at, cached = _model_list_cache
+        stale = {provider: cached[provider] for provider in clients if provider in cached}
+        if remote_models_disabled():
+            return stale
+        if len(stale) == len(clients) and now - synced_at < MODEL_LIST_TTL:
+            return stale
+
+        listed = {}
+        fetched = {}
+        for provider, client in clients.items():
+            try:
+                listed[provider] = fetched[provider] = [model.id async for model in client.models.list()]
+            except Exception as e:
+                if provider in stale:
+                    logger.warning(f"Could not list {provider} models, using cached listing: {str(e)}")
+                    listed[provider] = stale[provider]
+                else:
+                    logger.warning(f"Could not list {provider} models: {str(e)}")
+
+        if fetched:
+            _model_list_cache = (now, {**cached, **fetched})
+            await asyncio.to_thread(_write_listing_cache, fetched)
+        return listed
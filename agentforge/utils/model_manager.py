@@ -1,19 +1,355 @@
-from typing import Dict, Any, List, Optional, AsyncGenerator, Tuple, Union
+from typing import Dict, Any, List, Optional, AsyncGenerator, Tuple, Union, Callable, Set
+from dataclasses import dataclass, field
 import logging
-import json
-from openai import AsyncOpenAI, BadRequestError
+import asyncio
+import re
+import hashlib
+import weakref
+import httpx
+import orjson
+import tiktoken
+from aiolimiter import AsyncLimiter
+from functools import lru_cache
+from collections import OrderedDict, defaultdict
+import openai
+import anthropic
+from openai import AsyncOpenAI, BadRequestError, NotFoundError
 from anthropic import AsyncAnthropic
+from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from .llm_cache import LLMCache
+from .model_catalog import ModelSpec, load_catalog, list_provider_models
 import os
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str) -> "tiktoken.Encoding":
+    """Get the tokenizer for a model, using cl100k_base for models tiktoken
+    does not know (including Claude, where it is a close estimate)"""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+# Message texts whose token counts are memoized
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def _count_tokens(model_name: str, text: str) -> int:
+    """Count a text's tokens, memoized so unchanged history is not re-encoded"""
+    return len(_get_encoding(model_name).encode(text))
+
+# Length cap for conversation summaries made when compressing messages
+SUMMARY_MAX_TOKENS = 512
+
+# Anthropic requires max_tokens; used when the caller does not cap output
+DEFAULT_ANTHROPIC_MAX_TOKENS = 2048
+
+# System prompts shorter than this are below Anthropic's prompt caching minimum
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Anthropic models that accept cache_control on system prompt blocks
+PROMPT_CACHE_MODEL_PREFIXES = ("claude-3",)
+
+# Distinct tool lists whose Anthropic form is memoized; the least recently
+# used beyond this are dropped
+TOOL_CONVERSION_CACHE_SIZE = 64
+
+# Output cap for hedge backup calls, which go to smaller models with
+# lower output limits than the primary may have asked for
+HEDGE_MAX_TOKENS = 4096
+
+# Seconds between batch status checks, doubling up to the maximum
+BATCH_POLL_INTERVAL = 5.0
+BATCH_MAX_POLL_INTERVAL = 60.0
+
+# Sent when a model returns no text at all
+_DEFAULT_GREETING = "Hello! I'm here to help. What can I assist you with today?"
+
+# Display names of the supported providers, used in error messages
+PROVIDER_NAMES = {"openai": "OpenAI", "anthropic": "Anthropic"}
+
+# SDK client class for each provider
+PROVIDER_CLIENTS = {"openai": AsyncOpenAI, "anthropic": AsyncAnthropic}
+
+# Model name prefixes giving the provider of models outside the registry
+_PROVIDER_PREFIXES = (
+    ("gpt-", "openai"),
+    ("chatgpt-", "openai"),
+    ("o1", "openai"),
+    ("o3", "openai"),
+    ("o4", "openai"),
+    ("claude-", "anthropic")
+)
+
+def _infer_provider(model_name: str) -> Optional[str]:
+    """Get the provider a model name's prefix belongs to, or None"""
+    for prefix, provider in _PROVIDER_PREFIXES:
+        if model_name.startswith(prefix):
+            return provider
+    return None
+
+# Trailing text after the last word boundary in streamed output
+_WORD_TAIL_PATTERN = re.compile(r"[^\s.,!?;:]*\Z")
+
+# Answers that suggest a cheaper model could not handle the query
+_LOW_CONFIDENCE_PATTERN = re.compile(
+    r"\b(i don'?t know|i'?m not sure|i am not sure|i cannot answer|i can'?t answer|unable to (answer|determine))\b",
+    re.IGNORECASE
+)
+
+# One connection pool shared by every ModelManager and provider client, sized
+# from the environment for deployments with many concurrent streams. Pooled
+# connections belong to the event loop that opened them, so each running
+# loop gets its own client
+HTTP_MAX_CONNECTIONS = int(os.getenv("AF_HTTP_MAX_CONN", "500"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("AF_HTTP_KEEPALIVE", "200"))
+HTTP_TIMEOUT = float(os.getenv("AF_HTTP_TIMEOUT", "120"))
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the HTTP client shared on the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=60.0
+            ),
+            # Fail fast on unreachable hosts; leave room for long generations
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=5.0)
+        )
+        _http_clients[loop] = client
+        # SDK clients made earlier on this loop hold the closed HTTP client
+        _provider_clients.pop(loop, None)
+    return client
+
+async def close_http_client() -> None:
+    """Close the running event loop's shared HTTP client and its pooled connections"""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.pop(loop, None)
+    _provider_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+# SDK clients shared by every ModelManager on the running event loop, keyed
+# by provider and API key
+_provider_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], Any]]" = weakref.WeakKeyDictionary()
+
+def get_provider_client(provider: str, api_key: str) -> Any:
+    """Get the shared SDK client for a provider and API key, creating it on
+    first use on the running loop's HTTP client"""
+    http_client = get_http_client()
+    loop_clients = _provider_clients.setdefault(asyncio.get_running_loop(), {})
+    client = loop_clients.get((provider, api_key))
+    if client is None:
+        # Model requests are retried by _retry_transient, so the SDK's own
+        # retries are disabled to keep attempts from multiplying
+        client = PROVIDER_CLIENTS[provider](api_key=api_key, http_client=http_client, max_retries=0)
+        loop_clients[(provider, api_key)] = client
+    return client
+
+# Provider errors worth retrying: connection failures and timeouts, 429s and 5xxs
+TRANSIENT_PROVIDER_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    anthropic.APIConnectionError,
+    anthropic.RateLimitError,
+    anthropic.InternalServerError
+)
+PROVIDER_MAX_ATTEMPTS = int(os.getenv("AF_PROVIDER_MAX_ATTEMPTS", "5"))
+
+# Retries a provider request with jittered exponential backoff, in place of
+# the SDK's own retries. Each attempt takes its own rate limiter slot. Only
+# the request that starts a response is retried; a stream failing midway is not
+_retry_transient = retry(
+    retry=retry_if_exception_type(TRANSIENT_PROVIDER_ERRORS),
+    wait=wait_exponential_jitter(max=30),
+    stop=stop_after_attempt(PROVIDER_MAX_ATTEMPTS),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+
+# Caps on in-flight calls and requests per minute for each provider, shared
+# by every ModelManager like the connection pool. asyncio primitives belong
+# to one event loop, so each running loop gets its own
+PROVIDER_CONCURRENCY = {
+    "openai": int(os.getenv("OPENAI_CONCURRENCY", "32")),
+    "anthropic": int(os.getenv("ANTHROPIC_CONCURRENCY", "8"))
+}
+PROVIDER_REQUESTS_PER_MINUTE = {
+    "openai": int(os.getenv("OPENAI_RPM", "3000")),
+    "anthropic": int(os.getenv("ANTHROPIC_RPM", "1000"))
+}
+_provider_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Tuple[asyncio.Semaphore, AsyncLimiter]]]" = weakref.WeakKeyDictionary()
+
+def get_provider_limits(provider: str) -> Tuple[asyncio.Semaphore, AsyncLimiter]:
+    """Get the concurrency semaphore and rate limiter for a provider shared
+    on the running event loop"""
+    loop_limits = _provider_limits.setdefault(asyncio.get_running_loop(), {})
+    limits = loop_limits.get(provider)
+    if limits is None:
+        limits = (
+            asyncio.Semaphore(PROVIDER_CONCURRENCY[provider]),
+            AsyncLimiter(PROVIDER_REQUESTS_PER_MINUTE[provider], 60)
+        )
+        loop_limits[provider] = limits
+    return limits
+
+class _StreamCoalescer:
+    """Joins small streamed text deltas into fewer, larger chunks.
+    
+    The first delta is sent at once. Later ones are held until max_parts
+    are buffered or the oldest has waited flush_interval seconds, whether
+    or not another delta arrives.
+    """
+    
+    def __init__(self, flush_interval: float, max_parts: int):
+        self.flush_interval = flush_interval
+        self.max_parts = max_parts
+        self._parts: List[str] = []
+        self._loop = asyncio.get_running_loop()
+        self._held_since = 0.0
+        self._sent_any = False
+        
+    def add(self, text: str) -> Optional[str]:
+        """Buffer text, returning everything buffered once it is due to be sent"""
+        self._parts.append(text)
+        now = self._loop.time()
+        if len(self._parts) == 1:
+            self._held_since = now
+        if (not self._sent_any or len(self._parts) >= self.max_parts or
+                now - self._held_since >= self.flush_interval):
+            return self.flush()
+        return None
+        
+    def flush(self) -> Optional[str]:
+        """Return and clear everything buffered, or None if nothing is"""
+        if not self._parts:
+            return None
+        text = "".join(self._parts)
+        self._parts = []
+        self._sent_any = True
+        return text
+        
+    async def coalesce(
+        self,
+        source: AsyncGenerator[Union[str, Dict[str, Any]], None]
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Coalesce the text in a stream of text and event dicts.
+        
+        Buffered text is sent before each dict to keep events in order.
+        """
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if not self._parts:
+                    # Nothing is held, so wait for the next item as long as it takes
+                    try:
+                        if pending is None:
+                            item = await source.__anext__()
+                        else:
+                            next_item, pending = pending, None
+                            item = await next_item
+                    except StopAsyncIteration:
+                        break
+                else:
+                    # Wait no longer than the held text may be held
+                    if pending is None:
+                        pending = asyncio.ensure_future(source.__anext__())
+                    timeout = max(0.0, self._held_since + self.flush_interval - self._loop.time())
+                    done, _ = await asyncio.wait({pending}, timeout=timeout)
+                    if not done:
+                        text = self.flush()
+                        if text:
+                            yield text
+                        continue
+                    next_item, pending = pending, None
+                    try:
+                        item = next_item.result()
+                    except StopAsyncIteration:
+                        break
+                        
+                if isinstance(item, str):
+                    text = self.add(item)
+                    if text:
+                        yield text
+                else:
+                    text = self.flush()
+                    if text:
+                        yield text
+                    yield item
+                    
+            text = self.flush()
+            if text:
+                yield text
+        finally:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            await source.aclose()
+
+@dataclass
+class Conversation:
+    """Messages kept in both provider formats so neither is rebuilt per call.
+    
+    Attributes:
+        system: First system prompt, sent separately to Anthropic
+        openai_messages: Every message, in OpenAI chat format
+        anthropic_messages: User and assistant turns only, in Anthropic format
+    """
+    system: Optional[str] = None
+    openai_messages: List[Dict[str, Any]] = field(default_factory=list)
+    anthropic_messages: List[Dict[str, Any]] = field(default_factory=list)
+    
+    def add(self, role: str, content: str) -> None:
+        """Append a message to both views, sharing one dict between them"""
+        self._append({"role": role, "content": content})
+        
+    def _append(self, msg: Dict[str, Any]) -> None:
+        role = msg["role"]
+        self.openai_messages.append(msg)
+        if role == "system":
+            if self.system is None:
+                self.system = msg["content"]
+        elif role in ("user", "assistant"):
+            self.anthropic_messages.append(
+                msg if len(msg) == 2 else {"role": role, "content": msg["content"]}
+            )
+            
+    @classmethod
+    def from_list(cls, messages: List[Dict[str, Any]]) -> "Conversation":
+        """Build a conversation from OpenAI-style message dicts"""
+        conversation = cls()
+        for msg in messages:
+            conversation._append(msg)
+        return conversation
+
 class ModelManager:
     """Manages AI model interactions and API keys."""
     
+    # Sent when a model returns no text at all; override per class or instance
+    empty_response_text: str = _DEFAULT_GREETING
+    
     def __init__(
         self,
         openai_api_key: Optional[str] = None,
-        anthropic_api_key: Optional[str] = None
+        anthropic_api_key: Optional[str] = None,
+        response_cache_size: int = 256,
+        max_concurrency: int = 8,
+        flush_interval_ms: float = 20,
+        flush_max_parts: int = 8,
+        word_boundary: bool = False,
+        max_input_tokens: Optional[int] = None,
+        keep_recent_messages: int = 6,
+        call_timeout: Optional[float] = None,
+        hedge_after_ms: Optional[int] = None,
+        openai_fallback_model: Optional[str] = "gpt-4o-mini",
+        hedge_model: Optional[str] = None
     ):
         """Initialize the model manager with API keys."""
         self.api_keys = {
@@ -21,66 +357,121 @@ class ModelManager:
             "anthropic": anthropic_api_key
         }
         
-        # Initialize OpenAI client if key is provided
-        self.openai_client = None
-        if openai_api_key:
-            self.openai_client = AsyncOpenAI(api_key=openai_api_key)
-            
-        # Initialize Anthropic client if key is provided
-        self.anthropic_client = None
-        if anthropic_api_key:
-            self.anthropic_client = AsyncAnthropic(api_key=anthropic_api_key)
-            
-        # Map model names to actual model identifiers
-        self.model_mapping = {
-            "o3-mini": "gpt-4-0125-preview",  # Latest GPT-4 Turbo
-            "o1": "gpt-4",
-            "o1-mini": "gpt-4",
-            "o1-pro": "gpt-4",
-            "gpt-4o": "gpt-4",
-            "gpt-4o-mini": "gpt-4",
-            "gpt-4-turbo": "gpt-4-0125-preview",
-            "gpt-4": "gpt-4",
-            "gpt-4.5-preview": "gpt-4-0125-preview"
-        }
+        # Provider clients are shared per API key and created on first use
+        # (see _get_client); clients assigned here override them
+        self._clients: Dict[str, Any] = {}
+            
+        # Bounds how many provider calls call_batch runs at once; created on
+        # first use so it binds to the running event loop
+        self.max_concurrency = max_concurrency
+        self._call_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # Streamed text is sent once this many deltas are buffered or this much
+        # time has passed since the last send; 0 ms sends every delta
+        self.flush_interval_ms = flush_interval_ms
+        self.flush_max_parts = flush_max_parts
+        
+        # Hold back streamed OpenAI text until a word is complete; off by
+        # default so deltas are sent as they arrive
+        self.word_boundary = word_boundary
+        
+        # Anthropic tool schemas as JSON, keyed by the tool list's JSON with
+        # sorted keys so agents that rebuild the same tools on every call still hit
+        self._tool_conv_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
         
+        # Conversations longer than max_input_tokens keep their system prompt
+        # and most recent messages; older ones are replaced by a summary
+        self.max_input_tokens = max_input_tokens
+        self.keep_recent_messages = keep_recent_messages
+        self._summary_cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        
+        # Latency limits, both off by default: call_timeout caps a whole call in
+        # seconds, and a call with no output after hedge_after_ms is raced
+        # against a backup call on hedge_model, or else on the other
+        # provider's cheapest model
+        self.call_timeout = call_timeout
+        self.hedge_after_ms = hedge_after_ms
+        self.hedge_model = hedge_model
+        
+        # OpenAI model retried once when the requested model does not exist;
+        # None disables the retry
+        self.openai_fallback_model = openai_fallback_model
+        
+        # Recent complete responses for calls made with cache=True, oldest first
+        self.response_cache_size = response_cache_size
+        self._response_cache = LLMCache(response_cache_size)
+            
         # Ensure at least one API key is provided
         if not any(self.api_keys.values()):
             raise ValueError("At least one of OpenAI or Anthropic API key must be provided")
             
         # Initialize available models
-        self.available_models = {
-            "openai": {
-                "gpt-4": {
-                    "type": "chat",
-                    "category": "openai",
-                    "capabilities": ["conversation", "analysis", "creation"]
-                },
-                "gpt-3.5-turbo": {
-                    "type": "chat",
-                    "category": "openai",
-                    "capabilities": ["conversation", "analysis"]
-                }
-            },
-            "anthropic": {
-                "claude-2": {
-                    "type": "chat",
-                    "category": "anthropic",
-                    "capabilities": ["conversation", "analysis", "creation"]
-                },
-                "claude-instant-1": {
-                    "type": "chat",
-                    "category": "anthropic",
-                    "capabilities": ["conversation"]
-                }
-            }
+        self.available_models = load_catalog()
+        
+        # Explicit model order per task type for call_with_cascade; task
+        # types not listed cascade through the active models, cheapest first
+        self.cascades: Dict[str, List[str]] = {}
+        
+        # Model ids each provider reported serving (see
+        # refresh_available_models); providers not listed keep every model
+        self._listed_models: Dict[str, Set[str]] = {}
+        
+        self._rebuild_model_order()
+        
+    def _rebuild_model_order(self) -> None:
+        """Index the models of providers with an API key by name and sort
+        them by priority once instead of on every selection"""
+        self.active_models = {
+            provider: (
+                {name: spec for name, spec in models.items() if name in self._listed_models[provider]}
+                if provider in self._listed_models else models
+            )
+            for provider, models in self.available_models.items()
+            if self.api_keys.get(provider)
+        }
+        self._model_provider = {
+            model_name: provider
+            for provider, models in self.active_models.items()
+            for model_name in models
         }
+        self._selection_cache: Dict[Tuple[Optional[str], Tuple[str, ...]], Tuple[str, str]] = {}
+        self._pick_cache: Dict[Tuple[Tuple[str, ...], Optional[str], Optional[str]], Tuple[Optional[ModelSpec], bool]] = {}
+        self._models_by_priority = sorted(
+            (spec for models in self.active_models.values() for spec in models.values()),
+            key=lambda spec: spec.priority
+        )
+        
+        # Inverted indexes from type, category and capability to model names,
+        # so filtering is set intersection rather than a scan per requirement
+        self._models_by_type: Dict[str, Set[str]] = defaultdict(set)
+        self._models_by_category: Dict[str, Set[str]] = defaultdict(set)
+        self._models_by_capability: Dict[str, Set[str]] = defaultdict(set)
+        for spec in self._models_by_priority:
+            self._models_by_type[spec.model_type].add(spec.name)
+            self._models_by_category[spec.category].add(spec.name)
+            for capability in spec.capabilities:
+                self._models_by_capability[capability].add(spec.name)
+                
+        # Cascade order: cheapest first, priority breaking ties
+        self._models_by_cost = sorted(
+            self._models_by_priority,
+            key=lambda spec: (spec.cost, spec.priority)
+        )
         
-        # Track active models
-        self.active_models = {}
-        for provider, key in self.api_keys.items():
-            if key:
-                self.active_models[provider] = self.available_models[provider]
+    def _filter_models(
+        self,
+        models: List[ModelSpec],
+        model_type: Optional[str],
+        model_category: Optional[str]
+    ) -> List[ModelSpec]:
+        """Keep the models matching the type and category filters that are set, in order"""
+        if not model_type and not model_category:
+            return models
+        names = self._models_by_type.get(model_type, set()) if model_type else None
+        if model_category:
+            by_category = self._models_by_category.get(model_category, set())
+            names = by_category if names is None else names & by_category
+        return [spec for spec in models if spec.name in names]
 
     def set_api_key(self, provider: str, key: str) -> None:
         """Set an API key for a provider.
@@ -89,14 +480,46 @@ class ModelManager:
             provider: The provider name (e.g., "openai", "anthropic")
             key: The API key
         """
-        if provider not in ["openai", "anthropic"]:
+        if provider not in PROVIDER_NAMES:
             raise ValueError(f"Unsupported provider: {provider}")
             
+        # Keep the existing client, and its pooled connections, if the key is unchanged
+        if key == self.api_keys.get(provider):
+            return
+            
         self.api_keys[provider] = key
-        if key:
-            self.active_models[provider] = self.available_models[provider]
-        elif provider in self.active_models:
-            del self.active_models[provider]
+        self._clients.pop(provider, None)
+        self._rebuild_model_order()
+        
+    def _get_client(self, provider: str) -> Any:
+        """Get a provider's client, or None if the provider has no API key.
+
+        The shared client is looked up on every call rather than kept, so a
+        manager picks up the new one after close_http_client().
+        """
+        client = self._clients.get(provider)
+        if client is not None:
+            return client
+        key = self.api_keys.get(provider)
+        if not key:
+            return None
+        return get_provider_client(provider, key)
+        
+    @property
+    def openai_client(self) -> Optional[AsyncOpenAI]:
+        return self._get_client("openai")
+        
+    @openai_client.setter
+    def openai_client(self, client: Optional[AsyncOpenAI]) -> None:
+        self._clients["openai"] = client
+        
+    @property
+    def anthropic_client(self) -> Optional[AsyncAnthropic]:
+        return self._get_client("anthropic")
+        
+    @anthropic_client.setter
+    def anthropic_client(self, client: Optional[AsyncAnthropic]) -> None:
+        self._clients["anthropic"] = client
 
     async def select_model(
         self,
@@ -108,19 +531,48 @@ class ModelManager:
         """
         Legacy method for backward compatibility.
         Selects the most appropriate model based on the query and requirements.
+        
+        The result only depends on the preferred model, the required
+        capabilities and the active models, so it is memoized on those.
         """
-        async for update in self.select_model_with_progress(
-            query=query,
+        cache_key = (preferred_model, tuple(sorted(required_capabilities or ())))
+        selected = self._selection_cache.get(cache_key)
+        if selected is not None:
+            return selected
+            
+        selected = await self.select_model_fast(
             preferred_model=preferred_model,
-            required_capabilities=required_capabilities,
-            temperature=temperature
-        ):
-            if update.get("type") == "model_selected":
-                model_info = update.get("model", {})
-                return model_info.get("name"), model_info.get("provider")
+            required_capabilities=required_capabilities
+        )
+        self._selection_cache[cache_key] = selected
+        return selected
+
+    async def select_model_fast(
+        self,
+        preferred_model: Optional[str] = None,
+        required_capabilities: Optional[List[str]] = None,
+        model_type: Optional[str] = None,
+        model_category: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Select a model like select_model_with_progress, without the events.
         
-        # Fallback to default model if no model was selected
-        return "gpt-4", "openai"  # Default to GPT-4 if available
+        Returns:
+            (model name, provider)
+            
+        Raises:
+            ValueError: If no models are available with the current API keys
+        """
+        if preferred_model:
+            provider = self._model_provider.get(preferred_model)
+            if provider:
+                return preferred_model, provider
+                
+        spec, _ = self._pick_model(
+            tuple(sorted(required_capabilities or ())), model_type, model_category
+        )
+        if spec is None:
+            raise ValueError("No models available with current API keys")
+        return spec.name, spec.provider
 
     async def select_model_with_progress(
         self,
@@ -130,129 +582,100 @@ class ModelManager:
         temperature: float = 0.7,
         preferred_model: Optional[str] = None,
         model_type: Optional[str] = None,
-        model_category: Optional[str] = None
+        model_category: Optional[str] = None,
+        verbose: bool = True
     ) -> AsyncGenerator[Dict[str, Any], None]:
-        """Select the best model for a task with progress updates."""
-        yield {
-            "type": "workflow",
-            "step": "init",
-            "content": "🔄 Initializing model selection process..."
-        }
-
-        # If preferred model is specified and available, use it
-        if preferred_model:
+        """Select the best model for a task with progress updates.
+        
+        query and task_type are accepted for compatibility but do not affect
+        the choice, so they are not part of the memoized pick. With verbose
+        off only the final "model_selected" event is yielded.
+        """
+        if verbose:
             yield {
                 "type": "workflow",
-                "step": "check_preferred",
-                "content": f"🔍 Checking availability of preferred model: {preferred_model}"
+                "step": "init",
+                "content": "🔄 Initializing model selection process..."
             }
-            for provider, models in self.active_models.items():
-                if preferred_model in models:
+
+        # If preferred model is specified and available, use it
+        if preferred_model:
+            if verbose:
+                yield {
+                    "type": "workflow",
+                    "step": "check_preferred",
+                    "content": f"🔍 Checking availability of preferred model: {preferred_model}"
+                }
+            provider = self._model_provider.get(preferred_model)
+            if provider:
+                if verbose:
                     yield {
                         "type": "workflow",
                         "step": "selected",
                         "content": f"✅ Selected preferred model: {preferred_model} from {provider}"
                     }
-                    yield {
-                        "type": "model_selected",
-                        "model": {
-                            "name": preferred_model,
-                            "provider": provider,
-                            "temperature": temperature
-                        }
+                yield {
+                    "type": "model_selected",
+                    "model": {
+                        "name": preferred_model,
+                        "provider": provider,
+                        "temperature": temperature
                     }
-                    return
+                }
+                return
 
-        yield {
-            "type": "workflow",
-            "step": "filtering",
-            "content": "🔍 Filtering available models based on requirements..."
-        }
-                    
-        # Filter models by type and category if specified
-        available_models = {}
-        for provider, models in self.active_models.items():
-            for model_name, model_info in models.items():
-                if (not model_type or model_info["type"] == model_type) and \
-                   (not model_category or model_info["category"] == model_category):
-                    available_models[model_name] = {
-                        "info": model_info,
-                        "provider": provider
-                    }
+        if verbose:
+            yield {
+                "type": "workflow",
+                "step": "filtering",
+                "content": "🔍 Filtering available models based on requirements..."
+            }
+        
+        spec, filters_matched = self._pick_model(
+            tuple(sorted(required_capabilities or ())), model_type, model_category
+        )
 
-        # If no models match filters, use all active models
-        if not available_models:
+        # If no models match filters, all active models were considered
+        if verbose and not filters_matched:
             yield {
                 "type": "workflow",
                 "step": "fallback",
                 "content": "⚠️ No models match specific filters, considering all available models..."
             }
-            for provider, models in self.active_models.items():
-                for model_name, model_info in models.items():
-                    available_models[model_name] = {
-                        "info": model_info,
-                        "provider": provider
-                    }
 
         # If still no models available, raise error
-        if not available_models:
-            yield {
-                "type": "workflow",
-                "step": "error",
-                "content": "❌ Error: No models available with current API keys"
-            }
+        if spec is None:
+            if verbose:
+                yield {
+                    "type": "workflow",
+                    "step": "error",
+                    "content": "❌ Error: No models available with current API keys"
+                }
             raise ValueError("No models available with current API keys")
 
-        # Filter by required capabilities
-        if required_capabilities:
+        if verbose and required_capabilities:
             yield {
                 "type": "workflow",
                 "step": "capabilities",
                 "content": f"🔍 Checking models for required capabilities: {', '.join(required_capabilities)}"
             }
-            capable_models = {}
-            for model_name, model_info in available_models.items():
-                if all(cap in model_info["info"]["capabilities"] for cap in required_capabilities):
-                    capable_models[model_name] = model_info
-            available_models = capable_models or available_models
 
-        yield {
-            "type": "workflow",
-            "step": "selecting",
-            "content": "🎯 Selecting optimal model from available options..."
-        }
-
-        # Select the most capable model (prefer GPT-4 or Claude-2)
-        preferred_models = ["gpt-4", "claude-2", "gpt-3.5-turbo", "claude-instant-1"]
-        for model in preferred_models:
-            if model in available_models:
-                yield {
-                    "type": "workflow",
-                    "step": "selected",
-                    "content": f"✅ Selected model: {model} from {available_models[model]['provider']}"
-                }
-                yield {
-                    "type": "model_selected",
-                    "model": {
-                        "name": model,
-                        "provider": available_models[model]["provider"],
-                        "temperature": temperature
-                    }
-                }
-                return
-
-        # If no preferred models available, use first available
-        model_name = next(iter(available_models))
-        yield {
-            "type": "workflow",
-            "step": "fallback_selected",
-            "content": f"⚠️ Selected fallback model: {model_name} from {available_models[model_name]['provider']}"
-        }
+        if verbose:
+            yield {
+                "type": "workflow",
+                "step": "selecting",
+                "content": "🎯 Selecting optimal model from available options..."
+            }
+            yield {
+                "type": "workflow",
+                "step": "selected",
+                "content": f"✅ Selected model: {spec.name} from {spec.provider}"
+            }
         yield {
             "type": "model_selected",
             "model": {
-                "name": model_name,
-                "provider": available_models[model_name]["provider"],
+                "name": spec.name,
+                "provider": spec.provider,
                 "temperature": temperature
             }
         }
@@ -261,33 +684,81 @@ class ModelManager:
         self,
         model: Union[str, Dict[str, Any]],
         provider: Optional[str] = None,
-        messages: List[Dict[str, str]] = None,
+        messages: Union[List[Dict[str, str]], Conversation] = None,
         tools: Optional[List[Dict[str, Any]]] = None,
         temperature: Optional[float] = None,
         stream: bool = True,
-    ) -> AsyncGenerator[Dict[str, Any], None]:
-        """Call the AI model with tools."""
+        raw: bool = False,
+        cache: bool = False,
+        compress: bool = True,
+        max_tokens: Optional[int] = None,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Call the AI model with tools.
+        
+        messages may be a Conversation, which agent loops can extend with
+        add() so the provider formats are not rebuilt on every turn; a plain
+        message list is converted once per call.
+        
+        Response text is yielded as {"type": "response", "content": ...} dicts,
+        or as plain strings when raw is True so token streams skip a dict
+        allocation per chunk. Other events are always dicts.
+        
+        With cache, an identical earlier call (same model, messages, tools,
+        temperature and stream mode) is replayed from memory instead of
+        calling the provider. Only use it where a repeated answer is acceptable.
+        
+        With compress and max_input_tokens set, long conversations are trimmed
+        before the call (see _compress_messages).
+        
+        max_tokens caps the response length and stop_sequences end it early;
+        a model dict's "max_tokens" is used when max_tokens is not given.
+        """
         try:
             # Handle model parameter
             if isinstance(model, dict):
                 model_name = model.get("name")
                 provider = model.get("provider")
+                if max_tokens is None:
+                    max_tokens = model.get("max_tokens")
                 if not model_name or not provider:
                     raise ValueError("Model dictionary must contain 'name' and 'provider' keys")
             else:
                 model_name = model
+                if not provider:
+                    provider = self._model_provider.get(model_name)
                 if not provider:
                     # Try to determine provider from model name
-                    if model_name.startswith("gpt-"):
-                        provider = "openai"
-                    elif model_name.startswith("claude-"):
-                        provider = "anthropic"
-                    else:
-                        raise ValueError(f"Could not determine provider for model: {model_name}")
+                    provider = _infer_provider(model_name)
+                if not provider:
+                    raise ValueError(f"Could not determine provider for model: {model_name}")
+                
+            if not isinstance(messages, Conversation):
+                messages = Conversation.from_list(messages or [])
+            if compress and self.max_input_tokens and messages.openai_messages:
+                compressed = await self._compress_messages(messages.openai_messages, model_name)
+                if compressed is not messages.openai_messages:
+                    messages = Conversation.from_list(compressed)
 
-            # Map model name if needed
-            if model_name in self.model_mapping:
-                model_name = self.model_mapping[model_name]
+            cache_key = None
+            if cache:
+                cache_key = LLMCache.make_key(
+                    provider, model_name, messages.openai_messages, tools, temperature,
+                    stream, max_tokens, stop_sequences
+                )
+                cached = await self._response_cache.lookup(cache_key)
+                if cached is not None:
+                    yield {
+                        "type": "workflow",
+                        "step": "cache_hit",
+                        "content": f"⚡ Using cached response from {provider} model {model_name}..."
+                    }
+                    for chunk in cached:
+                        if raw or not isinstance(chunk, str):
+                            yield chunk
+                        else:
+                            yield {"type": "response", "content": chunk}
+                    return
 
             yield {
                 "type": "workflow",
@@ -295,30 +766,32 @@ class ModelManager:
                 "content": f"🔄 Calling {provider} API with model {model_name}..."
             }
 
-            if provider == "openai":
-                if not self.openai_client:
-                    raise ValueError("OpenAI API key not set")
-                async for chunk in self._call_openai(
-                    model=model_name,
-                    messages=messages,
-                    tools=tools,
-                    temperature=temperature,
-                    stream=stream
-                ):
-                    yield chunk
-            elif provider == "anthropic":
-                if not self.anthropic_client:
-                    raise ValueError("Anthropic API key not set")
-                async for chunk in self._call_anthropic(
-                    model=model_name,
-                    messages=messages,
-                    tools=tools,
-                    temperature=temperature,
-                    stream=stream
-                ):
+            call_args = {
+                "messages": messages,
+                "tools": tools,
+                "temperature": temperature,
+                "stream": stream,
+                "max_tokens": max_tokens,
+                "stop_sequences": stop_sequences
+            }
+            chunks = self._start_call(provider, model_name, call_args)
+            if self.call_timeout or self.hedge_after_ms is not None:
+                chunks = self._with_latency_limits(
+                    chunks,
+                    self._hedge_starter(provider, model_name, call_args)
+                )
+
+            collected = [] if cache_key else None
+            async for chunk in chunks:
+                if collected is not None:
+                    collected.append(chunk)
+                if raw or not isinstance(chunk, str):
                     yield chunk
-            else:
-                raise ValueError(f"Unsupported provider: {provider}")
+                else:
+                    yield {"type": "response", "content": chunk}
+                    
+            if collected is not None:
+                await self._response_cache.put(cache_key, collected)
 
         except Exception as e:
             yield {
@@ -328,232 +801,985 @@ class ModelManager:
             logger.error(f"Error in call_with_tools: {str(e)}")
             raise
 
-    async def _call_openai(
+    async def call_batch(
+        self,
+        calls: List[Dict[str, Any]]
+    ) -> List[Union[List[Union[str, Dict[str, Any]]], BaseException]]:
+        """Run independent model calls concurrently.
+        
+        Args:
+            calls: Keyword arguments for call_with_tools, one dict per call
+            
+        Returns:
+            For each call, in order, the list of chunks it yielded, or the
+            exception it raised; one failure does not cancel the others
+        """
+        if self._call_semaphore is None:
+            self._call_semaphore = asyncio.Semaphore(self.max_concurrency)
+            
+        async def run(call: Dict[str, Any]) -> List[Union[str, Dict[str, Any]]]:
+            async with self._call_semaphore:
+                return [chunk async for chunk in self.call_with_tools(**call)]
+                
+        return await asyncio.gather(*[run(call) for call in calls], return_exceptions=True)
+
+    async def call_many(
+        self,
+        model: Union[str, Dict[str, Any]],
+        message_batches: List[Union[List[Dict[str, str]], Conversation]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        temperature: Optional[float] = None,
+        provider: Optional[str] = None
+    ) -> List[Union[List[Union[str, Dict[str, Any]]], BaseException]]:
+        """Send several conversations to one model concurrently.
+        
+        Shorthand for call_batch with non-streaming raw calls that differ only
+        in their messages; results are in the same form and order.
+        """
+        return await self.call_batch([
+            {
+                "model": model,
+                "provider": provider,
+                "messages": messages,
+                "tools": tools,
+                "temperature": temperature,
+                "stream": False,
+                "raw": True
+            }
+            for messages in message_batches
+        ])
+
+    async def run_batch(
+        self,
+        model: str,
+        batch_requests: List[Dict[str, Any]],
+        provider: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """Run many independent prompts through the provider's batch API.
+        
+        Batches are billed at a discount but may take up to 24 hours, so this
+        is for offline and bulk work, not interactive calls.
+        
+        Args:
+            model: Model name
+            batch_requests: One dict per prompt with "messages" and optionally
+                "temperature", "max_tokens" and "stop_sequences"
+            provider: "openai" or "anthropic"; inferred from the model if omitted
+            
+        Returns:
+            Response text for each request, in order, or None where it failed
+        """
+        provider = provider or self._model_provider.get(model) or _infer_provider(model) or "openai"
+        self._require_client(provider)
+        if provider == "openai":
+            results = await self._run_openai_batch(model, batch_requests)
+        else:
+            results = await self._run_anthropic_batch(model, batch_requests)
+        return [results.get(str(i)) for i in range(len(batch_requests))]
+        
+    async def _poll_batch(self, retrieve: Callable[[], Any], is_done: Callable[[Any], bool]) -> Any:
+        """Poll a batch with exponential backoff until is_done accepts it"""
+        interval = BATCH_POLL_INTERVAL
+        while True:
+            batch = await retrieve()
+            if is_done(batch):
+                return batch
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, BATCH_MAX_POLL_INTERVAL)
+            
+    async def _run_openai_batch(
         self,
         model: str,
+        batch_requests: List[Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """Upload requests as a JSONL batch file and collect the outputs by custom_id"""
+        lines = []
+        for i, request in enumerate(batch_requests):
+            body = self._prepare_openai_params(
+                model,
+                Conversation.from_list(request["messages"]),
+                None,
+                request.get("temperature"),
+                False,
+                request.get("max_tokens"),
+                request.get("stop_sequences")
+            )
+            del body["stream"]
+            lines.append(orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            }))
+            
+        input_file = await self.openai_client.files.create(
+            file=("batch.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = await self.openai_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted OpenAI batch {batch.id} with {len(lines)} requests")
+        
+        batch = await self._poll_batch(
+            lambda: self.openai_client.batches.retrieve(batch.id),
+            lambda b: b.status in ("completed", "failed", "expired", "cancelled")
+        )
+        if batch.status != "completed":
+            logger.error(f"OpenAI batch {batch.id} ended with status {batch.status}")
+        if not batch.output_file_id:
+            return {}
+            
+        output = await self.openai_client.files.content(batch.output_file_id)
+        results = {}
+        for line in output.content.splitlines():
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") == 200:
+                results[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        return results
+        
+    async def _run_anthropic_batch(
+        self,
+        model: str,
+        batch_requests: List[Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """Submit a Message Batch and collect the succeeded results by custom_id"""
+        requests = []
+        for i, request in enumerate(batch_requests):
+            params = self._prepare_anthropic_params(
+                model,
+                Conversation.from_list(request["messages"]),
+                request.get("temperature"),
+                False,
+                request.get("max_tokens"),
+                request.get("stop_sequences")
+            )
+            del params["stream"]
+            requests.append({"custom_id": str(i), "params": params})
+            
+        batches = self.anthropic_client.messages.batches
+        batch = await batches.create(requests=requests)
+        logger.info(f"Submitted Anthropic batch {batch.id} with {len(requests)} requests")
+        
+        batch = await self._poll_batch(
+            lambda: batches.retrieve(batch.id),
+            lambda b: b.processing_status == "ended"
+        )
+        results = {}
+        async for item in await batches.results(batch.id):
+            if item.result.type == "succeeded":
+                results[item.custom_id] = "".join(
+                    block.text for block in item.result.message.content
+                    if block.type == "text"
+                )
+        return results
+
+    def _pick_model(
+        self,
+        required_capabilities: Tuple[str, ...],
+        model_type: Optional[str],
+        model_category: Optional[str]
+    ) -> Tuple[Optional[ModelSpec], bool]:
+        """Pick the highest-priority model meeting the requirements.
+        
+        Picks are memoized until the active models change.
+        
+        Returns:
+            The model, or None if no model is active, and whether any model
+            matched the type and category filters
+        """
+        cache_key = (required_capabilities, model_type, model_category)
+        picked = self._pick_cache.get(cache_key)
+        if picked is not None:
+            return picked
+            
+        # Filter models by type and category if specified, keeping priority order
+        available_models = self._filter_models(self._models_by_priority, model_type, model_category)
+            
+        # If no models match filters, use all active models
+        filters_matched = bool(available_models)
+        if not filters_matched:
+            available_models = self._models_by_priority
+            
+        # Prefer models with the required capabilities
+        if required_capabilities and available_models:
+            capable = set.intersection(*[
+                self._models_by_capability.get(capability, set())
+                for capability in required_capabilities
+            ])
+            capable_models = [spec for spec in available_models if spec.name in capable]
+            available_models = capable_models or available_models
+            
+        # Models are already sorted, so the first one is the most capable
+        # (GPT-4 or Claude-2 when available)
+        picked = (available_models[0] if available_models else None, filters_matched)
+        self._pick_cache[cache_key] = picked
+        return picked
+
+    def _start_call(
+        self,
+        provider: str,
+        model_name: str,
+        call_args: Dict[str, Any]
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Create the provider call generator for a model"""
+        self._require_client(provider)
+        if provider == "openai":
+            chunks = self._call_openai(model=model_name, **call_args)
+        else:
+            chunks = self._call_anthropic(model=model_name, **call_args)
+        return self._with_provider_limits(provider, chunks)
+        
+    async def _with_provider_limits(
+        self,
+        provider: str,
+        chunks: AsyncGenerator[Union[str, Dict[str, Any]], None]
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Run a call within the provider's concurrency limit, holding its slot
+        until the response has been fully streamed. The rate limit is taken
+        per request attempt, in _openai_create and _anthropic_create."""
+        semaphore, _ = get_provider_limits(provider)
+        try:
+            async with semaphore:
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            await chunks.aclose()
+        
+    def _require_client(self, provider: str) -> Any:
+        """Get a provider's client, raising if the provider is unknown or has no key"""
+        if provider not in PROVIDER_NAMES:
+            raise ValueError(f"Unsupported provider: {provider}")
+        client = self._get_client(provider)
+        if client is None:
+            raise ValueError(f"{PROVIDER_NAMES[provider]} API key not set")
+        return client
+        
+    def _hedge_starter(
+        self,
+        provider: str,
+        model_name: str,
+        call_args: Dict[str, Any]
+    ) -> Optional[Callable[[], AsyncGenerator[Union[str, Dict[str, Any]], None]]]:
+        """Get a function starting a backup call on hedge_model or the other
+        provider's cheapest model, or None if hedging is off or there is no
+        model to hedge with"""
+        if self.hedge_after_ms is None:
+            return None
+        backup = None
+        if self.hedge_model and self.hedge_model != model_name:
+            backup_provider = self._model_provider.get(self.hedge_model)
+            if backup_provider is not None:
+                backup = (self.hedge_model, backup_provider)
+        if backup is None:
+            backup = next(
+                ((spec.name, spec.provider) for spec in self._models_by_cost if spec.provider != provider),
+                None
+            )
+        if backup is None:
+            return None
+            
+        backup_name, backup_provider = backup
+        backup_args = call_args
+        if call_args.get("max_tokens"):
+            backup_args = {**call_args, "max_tokens": min(call_args["max_tokens"], HEDGE_MAX_TOKENS)}
+        logger.debug(f"Hedging {model_name} with {backup_name}")
+        return lambda: self._start_call(backup_provider, backup_name, backup_args)
+        
+    @staticmethod
+    def _call_failed(first: "asyncio.Future") -> bool:
+        """Whether a call's first item shows it failed: an exception other than
+        an empty stream, or an error event"""
+        error = first.exception()
+        if error is not None:
+            return not isinstance(error, StopAsyncIteration)
+        item = first.result()
+        return isinstance(item, dict) and item.get("type") == "error"
+        
+    async def _with_latency_limits(
+        self,
+        chunks: AsyncGenerator[Union[str, Dict[str, Any]], None],
+        start_backup: Optional[Callable[[], AsyncGenerator[Union[str, Dict[str, Any]], None]]]
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Apply call_timeout to a whole call and hedge slow first chunks.
+        
+        If the call has produced nothing after hedge_after_ms, or fails
+        before then, a backup call is started. Whichever yields a first item
+        that is not an error is streamed and the other is cancelled; if both
+        fail, the original call's error is passed on.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.call_timeout if self.call_timeout else None
+        
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - loop.time())
+            
+        first = asyncio.ensure_future(chunks.__anext__())
+        pending = [(first, chunks)]
+        try:
+            wait_for_hedge = self.hedge_after_ms / 1000 if start_backup else None
+            if wait_for_hedge is not None and deadline is not None:
+                wait_for_hedge = min(wait_for_hedge, remaining())
+            await asyncio.wait(
+                {first},
+                timeout=wait_for_hedge if wait_for_hedge is not None else remaining()
+            )
+            winner = first if first.done() else None
+            
+            if (start_backup and (winner is None or self._call_failed(winner)) and
+                    (deadline is None or remaining() > 0)):
+                backup = start_backup()
+                backup_first = asyncio.ensure_future(backup.__anext__())
+                pending.append((backup_first, backup))
+                racing = {backup_first} if first.done() else {first, backup_first}
+                winner = None
+                while racing and winner is None:
+                    done, racing = await asyncio.wait(
+                        racing,
+                        timeout=remaining(),
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        break
+                    winner = next((future for future in done if not self._call_failed(future)), None)
+                if winner is None and not racing:
+                    # Both calls failed
+                    winner = first
+                    
+            if winner is None:
+                raise asyncio.TimeoutError(f"Model call exceeded {self.call_timeout}s")
+            first, chunks = next((future, generator) for future, generator in pending if future is winner)
+                
+            # Stop the losing call, if any
+            for future, generator in pending:
+                if future is not first:
+                    future.cancel()
+                    await asyncio.gather(future, return_exceptions=True)
+                    await generator.aclose()
+            pending = [(first, chunks)]
+            
+            try:
+                item = first.result()
+            except StopAsyncIteration:
+                return
+            yield item
+            
+            while True:
+                try:
+                    if deadline is None:
+                        item = await chunks.__anext__()
+                    else:
+                        item = await asyncio.wait_for(chunks.__anext__(), remaining())
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise asyncio.TimeoutError(f"Model call exceeded {self.call_timeout}s")
+                yield item
+        finally:
+            for future, generator in pending:
+                if not future.done():
+                    future.cancel()
+                    await asyncio.gather(future, return_exceptions=True)
+                await generator.aclose()
+
+    def _cascade_tiers(
+        self,
+        task_type: Optional[str],
+        required_capabilities: Optional[List[str]],
+        model_type: Optional[str] = None,
+        model_category: Optional[str] = None
+    ) -> List[Tuple[str, str]]:
+        """Get the (model, provider) tiers to try for a task type.
+        
+        Tiers come from self.cascades when the task type is listed there, and
+        otherwise from every active model, cheapest first. Models outside the
+        type and category filters are left out, unless none match them.
+        """
+        if task_type in self.cascades:
+            models = [
+                self.active_models[self._model_provider[model_name]][model_name]
+                for model_name in self.cascades[task_type]
+                if model_name in self._model_provider
+            ]
+        else:
+            models = self._models_by_cost
+        models = self._filter_models(models, model_type, model_category) or models
+        
+        # Tiers missing a required capability are skipped, so demanding
+        # tasks start at a capable model
+        required = frozenset(required_capabilities or ())
+        return [(spec.name, spec.provider) for spec in models if required <= spec.capabilities]
+
+    async def call_with_cascade(
+        self,
         messages: List[Dict[str, str]],
-        tools: Optional[List[Dict[str, Any]]] = None,
+        task_type: Optional[str] = None,
+        required_capabilities: Optional[List[str]] = None,
         temperature: Optional[float] = None,
-        stream: bool = True,
-    ) -> AsyncGenerator[Dict[str, Any], None]:
-        """Call OpenAI API with the given parameters."""
-        if not self.openai_client:
-            raise ValueError("OpenAI API key not set")
+        accept: Optional[Callable[[str], bool]] = None,
+        max_tokens: Optional[int] = None,
+        model_type: Optional[str] = None,
+        model_category: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Answer with the cheapest model whose response is acceptable.
+        
+        Args:
+            messages: Chat messages to send
+            task_type: Key into self.cascades; unlisted types cascade
+                through the active models, cheapest first
+            required_capabilities: Capabilities every tried model must have
+            temperature: Sampling temperature
+            accept: Check for a usable answer, e.g. that it parses as JSON.
+                Defaults to rejecting empty or hedging answers.
+            max_tokens: Cap on each tier's response length
+            model_type: Only cascade through models of this type, if any match
+            model_category: Only cascade through models in this category, if any match
+                
+        Returns:
+            The response text and the name of the model that produced it
+        """
+        tiers = self._cascade_tiers(task_type, required_capabilities, model_type, model_category)
+        if not tiers:
+            tiers = [await self.select_model_fast(
+                required_capabilities=required_capabilities,
+                model_type=model_type,
+                model_category=model_category
+            )]
+        accept = accept or self._is_confident_answer
             
-        # Map model name to actual model identifier
-        actual_model = self.model_mapping.get(model, model)
+        text = ""
+        for index, (model_name, provider) in enumerate(tiers):
+            parts = []
+            failed = False
+            try:
+                async for chunk in self.call_with_tools(
+                    model=model_name,
+                    provider=provider,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=False,
+                    raw=True,
+                    max_tokens=max_tokens
+                ):
+                    if isinstance(chunk, str):
+                        parts.append(chunk)
+                    elif chunk.get("type") == "error":
+                        failed = True
+            except Exception as e:
+                logger.warning(f"Cascade tier {model_name} failed: {str(e)}")
+                failed = True
+            text = "".join(parts)
             
-        # Prepare parameters
+            if not failed and accept(text):
+                return text, model_name
+            if index + 1 < len(tiers):
+                logger.info(f"Escalating from {model_name} to {tiers[index + 1][0]}")
+                
+        return text, tiers[-1][0]
+        
+    @staticmethod
+    def _is_confident_answer(text: str) -> bool:
+        """Reject empty answers and ones that hedge"""
+        return bool(text.strip()) and not _LOW_CONFIDENCE_PATTERN.search(text)
+
+    async def _compress_messages(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str
+    ) -> List[Dict[str, str]]:
+        """Fit a conversation within max_input_tokens.
+        
+        Keeps the leading system prompt and the last keep_recent_messages
+        messages verbatim and folds a summary of everything in between into
+        the system prompt. The kept messages start at a user turn, as
+        Anthropic requires, so a few more may be summarized. If no model can
+        summarize, the messages are returned unchanged.
+        """
+        total = sum(_count_tokens(model_name, str(msg.get("content") or "")) for msg in messages)
+        if total <= self.max_input_tokens:
+            return messages
+            
+        system = messages[0] if messages[0]["role"] == "system" else None
+        body = messages[1:] if system else messages
+        if len(body) <= self.keep_recent_messages:
+            return messages
+        split = len(body) - self.keep_recent_messages
+        while split < len(body) and body[split]["role"] != "user":
+            split += 1
+        if split == len(body):
+            # No user turn among the recent messages; keep from the last one
+            split = next(
+                (i for i in range(len(body) - 1, -1, -1) if body[i]["role"] == "user"),
+                len(body)
+            )
+        if split == 0:
+            return messages
+        older = body[:split]
+        recent = body[split:]
+        
+        summary = await self._summarize_messages(older)
+        if not summary:
+            return messages
+            
+        system_content = f"{system['content']}\n\n" if system else ""
+        return [{
+            "role": "system",
+            "content": f"{system_content}Summary of the earlier conversation:\n{summary}"
+        }] + recent
+        
+    async def _summarize_messages(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """Summarize conversation messages with the cheapest available model of
+        any provider, moving on to the next one if it fails. The summary is
+        reused when the same messages are compressed again."""
+        transcript = "\n".join(f"{msg['role']}: {msg.get('content') or ''}" for msg in messages)
+        cache_key = hashlib.blake2b(transcript.encode(), digest_size=16).hexdigest()
+        if cache_key in self._summary_cache:
+            self._summary_cache.move_to_end(cache_key)
+            return self._summary_cache[cache_key]
+            
+        tiers = self._cascade_tiers("summary", None) or [
+            (spec.name, spec.provider) for spec in self._models_by_cost
+        ]
+        
+        summary = None
+        for model_name, provider in tiers:
+            summary = await self._summarize_with(model_name, provider, transcript)
+            if summary:
+                break
+        if not summary:
+            return None
+            
+        self._summary_cache[cache_key] = summary
+        while len(self._summary_cache) > self.response_cache_size:
+            self._summary_cache.popitem(last=False)
+        return summary
+        
+    async def _summarize_with(self, model_name: str, provider: str, transcript: str) -> Optional[str]:
+        """Summarize a transcript with one model, or return None if the call fails"""
+        parts = []
+        try:
+            async for chunk in self.call_with_tools(
+                model=model_name,
+                provider=provider,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Summarize this conversation concisely. Keep facts, decisions and open questions."
+                    },
+                    {"role": "user", "content": transcript}
+                ],
+                temperature=0.3,
+                stream=False,
+                raw=True,
+                compress=False,
+                max_tokens=SUMMARY_MAX_TOKENS
+            ):
+                if isinstance(chunk, str):
+                    parts.append(chunk)
+                elif chunk.get("type") == "error":
+                    return None
+        except Exception as e:
+            logger.warning(f"Could not summarize conversation with {model_name}: {str(e)}")
+            return None
+        return "".join(parts).strip() or None
+
+    def _stream_coalescer(self) -> _StreamCoalescer:
+        """Create a coalescer for one streamed response"""
+        return _StreamCoalescer(self.flush_interval_ms / 1000, self.flush_max_parts)
+
+    def _prepare_openai_params(
+        self,
+        model: str,
+        messages: Conversation,
+        tools: Optional[List[Dict[str, Any]]],
+        temperature: Optional[float],
+        stream: bool,
+        max_tokens: Optional[int],
+        stop_sequences: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Build chat completion parameters for the OpenAI API"""
         params = {
-            "model": actual_model,
-            "messages": messages,
+            "model": model,
+            "messages": messages.openai_messages,
             "temperature": temperature if temperature is not None else 0.7,
             "stream": stream
         }
         
-        # Add tools if provided
+        # Add tools and output limits if provided
         if tools:
             params["tools"] = tools
+        if max_tokens:
+            params["max_tokens"] = max_tokens
+        if stop_sequences:
+            params["stop"] = stop_sequences
+        return params
+
+    async def _call_openai(
+        self,
+        model: str,
+        messages: Conversation,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        temperature: Optional[float] = None,
+        stream: bool = True,
+        max_tokens: Optional[int] = None,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Call OpenAI API, yielding response text as strings and other events as dicts."""
+        if not self.openai_client:
+            raise ValueError("OpenAI API key not set")
+            
+        params = self._prepare_openai_params(
+            model, messages, tools, temperature, stream, max_tokens, stop_sequences
+        )
 
         try:
-            # Make API call
-            response = await self.openai_client.chat.completions.create(**params)
-
-            if stream:
-                content_buffer = ""
-                word_buffer = ""
-                async for chunk in response:
-                    # Get content from the chunk
-                    delta = chunk.choices[0].delta
-                    content = delta.content if hasattr(delta, 'content') and delta.content else None
-                    
-                    # If we have content, add it to buffer
-                    if content:
-                        content_buffer += content
-                        word_buffer += content
-                        
-                        # Check for word boundaries (space, punctuation)
-                        if any(char in word_buffer for char in " .,!?;:"):
-                            # Split and yield complete words
-                            words = word_buffer.split()
-                            for word in words[:-1]:  # All but last word
-                                yield {
-                                    "type": "response",
-                                    "content": word + " "
-                                }
-                            if words:  # Handle last word
-                                if word_buffer.strip().endswith(tuple(".,!?;:")):
-                                    yield {
-                                        "type": "response",
-                                        "content": words[-1] + word_buffer[word_buffer.rstrip().rfind(words[-1]) + len(words[-1]):] + " "
-                                    }
-                                else:
-                                    yield {
-                                        "type": "response",
-                                        "content": words[-1] + " "
-                                    }
-                            word_buffer = ""
-                    
-                    # Handle tool calls
-                    tool_calls = delta.tool_calls if hasattr(delta, 'tool_calls') and delta.tool_calls else None
-                    if tool_calls:
-                        for tool_call in tool_calls:
-                            yield {
-                                "type": "tool_call",
-                                "tool_call": {
-                                    "id": tool_call.id,
-                                    "type": tool_call.type,
-                                    "function": {
-                                        "name": tool_call.function.name,
-                                        "arguments": tool_call.function.arguments
-                                    }
-                                }
-                            }
-                
-                # Handle any remaining content in word buffer
-                if word_buffer.strip():
-                    yield {
-                        "type": "response",
-                        "content": word_buffer.strip() + " "
-                    }
-                
-                # If we got no content at all, yield a default response
-                if not content_buffer:
-                    yield {
-                        "type": "response",
-                        "content": "Hello! I'm here to help. What can I assist you with today?"
-                    }
-            else:
-                choice = response.choices[0]
-                if hasattr(choice, 'message'):
-                    message = choice.message
-                    if hasattr(message, 'content') and message.content:
-                        yield {
-                            "type": "response",
-                            "content": message.content
-                        }
-                    if hasattr(message, 'tool_calls') and message.tool_calls:
-                        for tool_call in message.tool_calls:
-                            yield {
-                                "type": "tool_call",
-                                "tool_call": {
-                                    "id": tool_call.id,
-                                    "type": tool_call.type,
-                                    "function": {
-                                        "name": tool_call.function.name,
-                                        "arguments": tool_call.function.arguments
-                                    }
-                                }
-                            }
-                else:
-                    yield {
-                        "type": "response",
-                        "content": "Hello! I'm here to help. What can I assist you with today?"
-                    }
-                    
+            response = await self._create_openai_completion(params)
         except Exception as e:
-            logger.error(f"Error calling OpenAI API: {str(e)}")
+            logger.exception("Error calling OpenAI API")
             yield {
                 "type": "error",
                 "content": f"Error calling OpenAI API: {str(e)}"
             }
+            return
+
+        async for item in self._openai_response_events(response, stream):
+            yield item
+
+    async def _create_openai_completion(self, params: Dict[str, Any]) -> Any:
+        """Create a chat completion, retrying once with openai_fallback_model
+        if the requested model does not exist"""
+        try:
+            return await self._openai_create(params)
+        except (BadRequestError, NotFoundError) as e:
+            fallback = self.openai_fallback_model
+            if getattr(e, "code", None) != "model_not_found" or not fallback or params["model"] == fallback:
+                raise
+            logger.warning(f"OpenAI model {params['model']} not found, retrying with {fallback}")
+            return await self._openai_create({**params, "model": fallback})
+
+    @_retry_transient
+    async def _openai_create(self, params: Dict[str, Any]) -> Any:
+        """Create a chat completion within the rate limit, retrying transient failures"""
+        await get_provider_limits("openai")[1].acquire()
+        return await self.openai_client.chat.completions.create(**params)
+
+    async def _openai_response_events(
+        self,
+        response,
+        stream: bool
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Turn an OpenAI chat completion, streamed or not, into text and tool call events"""
+        if stream:
+            async for item in self._stream_openai(response):
+                yield item
+            return
+            
+        choice = response.choices[0]
+        message = getattr(choice, "message", None)
+        if message is not None:
+            content = getattr(message, "content", None)
+            if content:
+                yield content
+            tool_calls = getattr(message, "tool_calls", None)
+            if tool_calls:
+                for tool_call in tool_calls:
+                    yield {
+                        "type": "tool_call",
+                        "tool_call": {
+                            "id": tool_call.id,
+                            "type": tool_call.type,
+                            "function": {
+                                "name": tool_call.function.name,
+                                "arguments": tool_call.function.arguments
+                            }
+                        }
+                    }
+        else:
+            yield self.empty_response_text
+
+    def _stream_openai(self, response) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Turn an OpenAI chat completion stream into coalesced text and tool call events"""
+        return self._stream_coalescer().coalesce(self._openai_stream_events(response))
+
+    async def _openai_stream_events(self, response) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Turn an OpenAI chat completion stream into text deltas and tool call events"""
+        # Only whether any text arrived matters, so the full text is not kept
+        received_content = False
+        word_buffer = ""
+        async for chunk in response:
+            # Get content from the chunk
+            delta = chunk.choices[0].delta
+            content = getattr(delta, "content", None)
+            
+            if content:
+                received_content = True
+                if self.word_boundary:
+                    # Send everything up to the last word boundary (whitespace
+                    # or punctuation) and keep only the unfinished word
+                    word_buffer += content
+                    tail_start = _WORD_TAIL_PATTERN.search(word_buffer).start()
+                    content = word_buffer[:tail_start]
+                    word_buffer = word_buffer[tail_start:]
+                if content:
+                    yield content
+            
+            # Handle tool calls
+            tool_calls = getattr(delta, "tool_calls", None)
+            if tool_calls:
+                for tool_call in tool_calls:
+                    yield {
+                        "type": "tool_call",
+                        "tool_call": {
+                            "id": tool_call.id,
+                            "type": tool_call.type,
+                            "function": {
+                                "name": tool_call.function.name,
+                                "arguments": tool_call.function.arguments
+                            }
+                        }
+                    }
+        
+        # Handle any remaining content in word buffer
+        if word_buffer:
+            yield word_buffer
+        
+        # If we got no content at all, yield a default response
+        if not received_content:
+            yield self.empty_response_text
+
+    def _prepare_anthropic_params(
+        self,
+        model: str,
+        messages: Conversation,
+        temperature: Optional[float],
+        stream: bool,
+        max_tokens: Optional[int],
+        stop_sequences: Optional[List[str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Build message parameters for the Anthropic API"""
+        system_message = messages.system
+        params = {
+            "model": model,
+            "messages": messages.anthropic_messages,
+            "max_tokens": max_tokens or DEFAULT_ANTHROPIC_MAX_TOKENS,
+            "stream": stream
+        }
+        if stop_sequences:
+            params["stop_sequences"] = stop_sequences
+        if tools:
+            anthropic_tools = self._convert_to_anthropic_tools(tools)
+            if anthropic_tools:
+                params["tools"] = list(anthropic_tools)
+        
+        # Add system message if present, marked for prompt caching when the
+        # model supports it and the prompt is long enough to qualify
+        if system_message:
+            if (model.startswith(PROMPT_CACHE_MODEL_PREFIXES) and
+                    _count_tokens(model, system_message) >= PROMPT_CACHE_MIN_TOKENS):
+                params["system"] = [{
+                    "type": "text",
+                    "text": system_message,
+                    "cache_control": {"type": "ephemeral"}
+                }]
+            else:
+                params["system"] = system_message
+            
+        # Only add temperature if explicitly provided
+        if temperature is not None:
+            params["temperature"] = temperature
+        return params
+
+    @_retry_transient
+    async def _anthropic_create(self, params: Dict[str, Any]) -> Any:
+        """Create a message within the rate limit, retrying transient failures"""
+        await get_provider_limits("anthropic")[1].acquire()
+        return await self.anthropic_client.messages.create(**params)
 
     async def _call_anthropic(
         self,
         model: str,
-        messages: List[Dict[str, str]],
+        messages: Conversation,
         tools: Optional[List[Dict[str, Any]]] = None,
         temperature: Optional[float] = None,
         stream: bool = True,
-    ) -> AsyncGenerator[Dict[str, Any], None]:
-        """Call Anthropic API with the given parameters."""
-        try:
-            if not self.anthropic_client:
-                yield {
-                    "type": "error",
-                    "content": "Anthropic API key not provided"
-                }
-                return
-                
-            # Convert messages to Anthropic format
-            system_message = next((msg["content"] for msg in messages if msg["role"] == "system"), None)
-            user_messages = [msg["content"] for msg in messages if msg["role"] == "user"]
-            
-            # Prepare parameters
-            params = {
-                "model": model,
-                "messages": [
-                    {"role": "user", "content": content}
-                    for content in user_messages
-                ],
-                "stream": stream
+        max_tokens: Optional[int] = None,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Call Anthropic API, yielding response text as strings and other events as dicts."""
+        if not self.anthropic_client:
+            yield {
+                "type": "error",
+                "content": "Anthropic API key not provided"
             }
+            return
             
-            # Add system message if present
-            if system_message:
-                params["system"] = system_message
-                
-            # Only add temperature if explicitly provided
-            if temperature is not None:
-                params["temperature"] = temperature
-
-            # Make API call
-            response = await self.anthropic_client.messages.create(**params)
-
-            if stream:
-                async for chunk in response:
-                    if chunk.delta.text:
-                        yield {
-                            "type": "response",
-                            "content": chunk.delta.text
-                        }
-            else:
-                yield {
-                    "type": "response",
-                    "content": response.content[0].text
-                }
+        params = self._prepare_anthropic_params(
+            model, messages, temperature, stream, max_tokens, stop_sequences, tools
+        )
+
+        try:
+            response = await self._anthropic_create(params)
         except Exception as e:
+            logger.exception("Error calling Anthropic API")
             yield {
                 "type": "error",
                 "content": f"Anthropic API error: {str(e)}"
             }
+            return
 
-    def _convert_to_anthropic_tools(self, openai_tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Convert OpenAI tool format to Anthropic format"""
-        anthropic_tools = []
-        for tool in openai_tools:
-            if tool["type"] == "function":
-                anthropic_tools.append({
-                    "type": "function",
-                    "function": {
-                        "name": tool["function"]["name"],
-                        "parameters": tool["function"]["parameters"],
-                        "description": tool["function"].get("description", "")
+        if not stream:
+            text = "".join(block.text for block in response.content if block.type == "text")
+            if text:
+                yield text
+            tool_uses = [block for block in response.content if block.type == "tool_use"]
+            for tool_call in self._convert_from_anthropic_tool_calls(tool_uses):
+                yield {"type": "tool_call", "tool_call": tool_call}
+            return
+            
+        async for item in self._stream_coalescer().coalesce(self._anthropic_stream_events(response)):
+            yield item
+
+    async def _anthropic_stream_events(self, response) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """Get the text deltas and completed tool calls of an Anthropic message stream"""
+        # Tool use blocks by index, with their argument JSON as it arrives
+        tool_uses: Dict[int, Tuple[Any, List[str]]] = {}
+        async for chunk in response:
+            if chunk.type == "content_block_start":
+                block = getattr(chunk, "content_block", None)
+                if getattr(block, "type", None) == "tool_use":
+                    tool_uses[chunk.index] = (block, [])
+                continue
+            if chunk.type == "content_block_stop":
+                tool_use = tool_uses.pop(getattr(chunk, "index", None), None)
+                if tool_use is not None:
+                    block, parts = tool_use
+                    yield {
+                        "type": "tool_call",
+                        "tool_call": {
+                            "id": block.id,
+                            "type": "function",
+                            "function": {"name": block.name, "arguments": "".join(parts) or "{}"}
+                        }
                     }
-                })
-        return anthropic_tools
-        
-    def _convert_from_anthropic_tool_calls(self, anthropic_tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Convert Anthropic tool calls to OpenAI format for consistency"""
-        openai_tool_calls = []
-        for call in anthropic_tool_calls:
-            if call["type"] == "function":
-                openai_tool_calls.append({
-                    "type": "function",
-                    "function": {
-                        "name": call["function"]["name"],
-                        "arguments": json.dumps(call["function"]["arguments"])
-                    },
-                    "id": call.get("id", "")
-                })
-        return openai_tool_calls
+                continue
+            # Only text and tool input deltas carry content; message_start,
+            # message_delta and the like are skipped
+            if chunk.type != "content_block_delta":
+                continue
+            delta_type = getattr(chunk.delta, "type", None)
+            if delta_type == "text_delta":
+                if chunk.delta.text:
+                    yield chunk.delta.text
+            elif delta_type == "input_json_delta":
+                tool_use = tool_uses.get(getattr(chunk, "index", None))
+                if tool_use is not None:
+                    tool_use[1].append(chunk.delta.partial_json)
+
+    def _convert_to_anthropic_tools(self, openai_tools: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], ...]:
+        """Convert OpenAI function tools to Anthropic tool definitions.
+        
+        Agents pass the same tools on every call, so the conversion is
+        memoized by the tools' content. The memo holds the converted tools
+        as JSON and each call gets its own copy, so changes to a returned
+        schema, or to the caller's tools, never reach later calls. Tools
+        already in Anthropic form (name and input_schema) are kept as they
+        are; tools of other types are left out.
+        """
+        try:
+            cache_key = orjson.dumps(openai_tools, option=orjson.OPT_SORT_KEYS)
+        except orjson.JSONEncodeError:
+            cache_key = None
+        converted = self._tool_conv_cache.get(cache_key)
+        if converted is not None:
+            self._tool_conv_cache.move_to_end(cache_key)
+        else:
+            anthropic_tools = []
+            for tool in openai_tools:
+                if tool.get("type") == "function" and "function" in tool:
+                    anthropic_tools.append({
+                        "name": tool["function"]["name"],
+                        "description": tool["function"].get("description", ""),
+                        "input_schema": tool["function"]["parameters"]
+                    })
+                elif "function" not in tool and "name" in tool and "input_schema" in tool:
+                    anthropic_tools.append(tool)
+            converted = orjson.dumps(anthropic_tools)
+            if cache_key is not None:
+                self._tool_conv_cache[cache_key] = converted
+                while len(self._tool_conv_cache) > TOOL_CONVERSION_CACHE_SIZE:
+                    self._tool_conv_cache.popitem(last=False)
+        return tuple(orjson.loads(converted))
+        
+    def _convert_from_anthropic_tool_calls(self, tool_uses: List[Any]) -> List[Dict[str, Any]]:
+        """Convert Anthropic tool_use blocks to OpenAI tool calls for consistency"""
+        return [
+            {
+                "id": block.id,
+                "type": "function",
+                "function": {
+                    "name": block.name,
+                    "arguments": orjson.dumps(block.input).decode()
+                }
+            }
+            for block in tool_uses
+        ]
 
     def set_openai_key(self, api_key: str):
         """Set or update the OpenAI API key."""
-        self.api_keys["openai"] = api_key
-        self.openai_client = AsyncOpenAI(api_key=api_key)
+        self.set_api_key("openai", api_key)
         
     def set_anthropic_key(self, api_key: str):
         """Set or update the Anthropic API key."""
-        self.api_keys["anthropic"] = api_key
-        self.anthropic_client = AsyncAnthropic(api_key=api_key) 
\ No newline at end of file
+        self.set_api_key("anthropic", api_key)
+        
+    async def refresh_available_models(self) -> None:
+        """Drop registry models their provider no longer serves, using the
+        cached provider model listings"""
+        clients = {
+            provider: self._get_client(provider)
+            for provider in PROVIDER_NAMES
+            if self.api_keys.get(provider)
+        }
+        listed = await list_provider_models(clients)
+        self._listed_models = {
+            provider: set(model_ids) for provider, model_ids in listed.items() if model_ids
+        }
+        self._rebuild_model_order()
+
+    async def prewarm(self) -> None:
+        """Open pooled connections to each configured provider ahead of the
+        first model call, so that call does not pay for TCP and TLS setup.
+        
+        Failures are logged and ignored; the real call will retry the connection.
+        """
+        async def warm(name: str, client: Any) -> None:
+            try:
+                await client.models.list()
+            except Exception as e:
+                logger.warning(f"Could not prewarm {name} connection: {str(e)}")
+                
+        await asyncio.gather(*[
+            warm(provider, client)
+            for provider, client in (("openai", self.openai_client), ("anthropic", self.anthropic_client))
+            if client is not None
+        ])
+
+    async def aclose(self):
+        """Drop the clients assigned to this manager.
+
+        The connection pool is shared by all model managers and stays open;
+        close it with close_http_client() once on application shutdown.
+        """
+        self._clients.clear()
+        
+    async def __aenter__(self) -> "ModelManager":
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose() 
\ No newline at end of file
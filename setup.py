@@ -9,12 +9,19 @@ setup(
         "uvicorn>=0.15.0",
         "python-dotenv>=0.19.0",
         "pydantic>=1.8.2",
-        "openai>=1.0.0",
-        "anthropic>=0.5.0",
+        "openai>=1.18.0",
+        "anthropic>=0.42.0,<1",
+        "httpx[http2]>=0.24.0",
         "langchain>=0.1.0",
         "langchain-openai>=0.0.2",
         "langchain-community>=0.0.10",
         "chromadb>=0.4.0",
+        "tenacity>=8.2.2",
+        "aiolimiter>=1.1.0",
+        "orjson>=3.9.0",
+        "pypdf>=3.9.0",
+        "tiktoken>=0.5.1",
+        "docx2txt>=0.8",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.10",
 ) 
\ No newline at end of file
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from agentforge.utils.batcher import AsyncBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions_share_batches():
+    batches = []
+
+    async def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = AsyncBatcher(double, max_batch_size=3, max_wait_s=0.01)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+
+    assert results == [0, 2, 4, 6, 8, 10, 12]
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_sent_after_max_wait():
+    async def echo(items):
+        return items
+
+    batcher = AsyncBatcher(echo, max_batch_size=100, max_wait_s=0.01)
+    assert await asyncio.wait_for(batcher.submit("only"), 1) == "only"
+
+
+@pytest.mark.asyncio
+async def test_batch_error_reaches_every_submitter():
+    async def fail(items):
+        raise RuntimeError("provider down")
+
+    batcher = AsyncBatcher(fail, max_batch_size=2, max_wait_s=0.01)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_wrong_result_count_is_an_error():
+    async def short(items):
+        return items[:1]
+
+    batcher = AsyncBatcher(short, max_batch_size=2, max_wait_s=0.01)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_batch_does_not_strand_submitters():
+    started = asyncio.Event()
+
+    async def hang(items):
+        started.set()
+        await asyncio.sleep(60)
+
+    batcher = AsyncBatcher(hang, max_batch_size=2, max_wait_s=0.01)
+    submitters = [asyncio.ensure_future(batcher.submit(i)) for i in range(2)]
+    await started.wait()
+    for task in list(batcher._running):
+        task.cancel()
+
+    results = await asyncio.wait_for(asyncio.gather(*submitters, return_exceptions=True), 1)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
@@ -0,0 +1,235 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from agentforge.utils import document_manager
+from agentforge.utils.document_manager import DocumentManager, IngestBuffer, get_embedding_limits
+from agentforge.utils.metadata_store import SqliteMetadata
+
+
+def test_ingest_buffer_fills_and_empties():
+    buffer = IngestBuffer(flush_threshold=3)
+    buffer.add("docs:a.txt", ["one", "two"], [{"i": 0}, {"i": 1}], {"hash": "h1"})
+    assert not buffer.is_full()
+    buffer.add("docs:b.txt", ["three"], [{"i": 0}], {"hash": "h2"})
+    assert buffer.is_full()
+
+    texts, metadatas, pending = buffer.take()
+
+    assert texts == ["one", "two", "three"]
+    assert len(metadatas) == 3
+    assert set(pending) == {"docs:a.txt", "docs:b.txt"}
+    assert buffer.texts == [] and buffer.pending_metadata == {}
+
+
+@pytest.mark.asyncio
+async def test_embedding_limits_are_shared_per_api_key():
+    first = get_embedding_limits("key-1", 100, 1000)
+
+    assert get_embedding_limits("key-1", 5, 5) is first
+    assert get_embedding_limits("key-2", 100, 1000) is not first
+
+
+def test_embedding_limits_work_on_successive_event_loops():
+    async def contend():
+        request_limiter, _ = get_embedding_limits("key-loops", 2, 1000)
+
+        async def acquire():
+            async with request_limiter:
+                pass
+
+        await asyncio.gather(acquire(), acquire())
+        return request_limiter
+
+    first = asyncio.run(asyncio.wait_for(contend(), 1))
+    second = asyncio.run(asyncio.wait_for(contend(), 1))
+
+    assert second is not first
+
+
+@pytest.mark.asyncio
+async def test_repeated_chunks_are_embedded_once(tmp_path):
+    manager = DocumentManager.__new__(DocumentManager)
+    manager.embeddings = SimpleNamespace(model="test-embedding")
+    manager.metadata = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+    embedded = []
+
+    async def embed(texts):
+        embedded.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    manager._embed_documents = embed
+
+    assert await manager._get_embeddings(["aa", "bbb", "aa"]) == [[2.0], [3.0], [2.0]]
+    assert await manager._get_embeddings(["bbb", "cccc"]) == [[3.0], [4.0]]
+    assert embedded == [["aa", "bbb"], ["cccc"]]
+    manager.metadata.close()
+
+
+class FakeCollection:
+    def __init__(self, metadatas):
+        self.metadatas = metadatas
+
+    def get(self, include, limit, offset):
+        ids = list(self.metadatas)[offset:offset + limit]
+        return {"ids": ids, "metadatas": [self.metadatas[chunk_id] for chunk_id in ids]}
+
+    def update(self, ids, metadatas):
+        self.metadatas.update(zip(ids, metadatas))
+
+
+def test_chunks_stored_without_file_ext_are_backfilled(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_manager, "BACKFILL_PAGE_SIZE", 2)
+    collection = FakeCollection({
+        "1": {"source": "/docs/A.PDF", "assistant": "docs"},
+        "2": {"source": "/docs/b.txt", "file_ext": ".txt"},
+        "3": {"source": "/docs/c.csv"},
+    })
+    manager = DocumentManager.__new__(DocumentManager)
+    manager.vectorstore = SimpleNamespace(_collection=collection)
+    manager.metadata = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+
+    manager._backfill_file_ext()
+
+    assert collection.metadatas["1"] == {"source": "/docs/A.PDF", "assistant": "docs", "file_ext": ".pdf"}
+    assert collection.metadatas["3"]["file_ext"] == ".csv"
+    manager.metadata.close()
+
+
+def query_manager(searches):
+    """DocumentManager with a fake query embedder and vector search"""
+    async def embed(query):
+        return [0.0]
+
+    def search(embedding, k, filter):
+        searches.append(filter)
+        return []
+
+    manager = DocumentManager.__new__(DocumentManager)
+    manager._query_batcher = SimpleNamespace(submit=embed)
+    manager.vectorstore = SimpleNamespace(similarity_search_by_vector=search)
+    manager._file_ext_migrated = True
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_file_ext_backfill_runs_once_before_the_first_file_type_query(tmp_path):
+    manager = query_manager([])
+    manager.metadata = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+    manager._file_ext_migrated = False
+    manager._migration_lock = threading.Lock()
+    backfills = []
+    manager._backfill_file_ext = lambda: backfills.append(threading.get_ident())
+
+    await manager.query_documents("q", assistant_name="docs")
+    assert backfills == []
+
+    await asyncio.gather(
+        manager.query_documents("q", file_types=["pdf"]),
+        manager.query_documents("q", file_types=["txt"])
+    )
+
+    assert len(backfills) == 1
+    assert backfills[0] != threading.get_ident()
+    assert manager.metadata.has_migrated("chunk_file_ext")
+    manager.metadata.close()
+
+
+@pytest.mark.asyncio
+async def test_file_type_filter_accepts_extensions_without_a_dot():
+    searches = []
+    manager = query_manager(searches)
+
+    await manager.query_documents("q", file_types=["pdf", ".TXT"])
+
+    assert searches == [{"file_ext": {"$in": [".pdf", ".txt"]}}]
+
+
+@pytest.mark.asyncio
+async def test_metadata_changes_are_kept_when_saving_fails(tmp_path):
+    manager = DocumentManager.__new__(DocumentManager)
+    manager.metadata = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+    manager._metadata_updates = {"docs:a.txt": {"hash": "h1", "num_chunks": 2}}
+    upsert_many = manager.metadata.upsert_many
+
+    def fail(rows):
+        raise OSError("disk full")
+
+    manager.metadata.upsert_many = fail
+    with pytest.raises(OSError):
+        await manager._save_metadata()
+    assert manager._metadata_updates == {"docs:a.txt": {"hash": "h1", "num_chunks": 2}}
+
+    manager.metadata.upsert_many = upsert_many
+    stats = await manager.aget_stats()
+
+    assert stats["total_files"] == 1 and stats["total_chunks"] == 2
+    assert manager._metadata_updates == {}
+    manager.metadata.close()
+
+
+def test_get_stats_stays_synchronous(tmp_path):
+    manager = DocumentManager.__new__(DocumentManager)
+    manager.metadata = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+    manager._metadata_updates = {"docs:a.txt": {"hash": "h1", "num_chunks": 2}}
+
+    stats = manager.get_stats()
+
+    assert stats["total_files"] == 1 and stats["total_chunks"] == 2
+    assert manager._metadata_updates == {}
+    manager.metadata.close()
+
+
+@pytest.mark.asyncio
+async def test_directory_pipeline_moves_files_of_a_failed_batch_to_errors(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for name in ["a", "b", "bad", "c"]:
+        (docs / f"{name}.txt").write_text(f"contents of {name}")
+    (docs / "notes.xyz").write_text("unsupported")
+    manager = DocumentManager(str(tmp_path), "sk-test", flush_threshold=1)
+
+    async def embed(texts):
+        if any("bad" in text for text in texts):
+            raise RuntimeError("embedding failed")
+        return [[0.1, 0.2] for _ in texts]
+
+    manager._get_embeddings = embed
+
+    stats = await manager.process_directory(str(docs), "docs")
+
+    assert stats["processed"] == 3
+    assert stats["errors"] == 1
+    assert stats["error_files"] == [{"file": str(docs / "bad.txt"), "error": "embedding failed"}]
+    assert manager.vectorstore._collection.count() == 3
+    # Only files whose chunks were stored are recorded as processed
+    assert manager.metadata.get(f"docs:{docs / 'bad.txt'}") is None
+
+    again = await manager.process_directory(str(docs), "docs")
+
+    assert again["unchanged"] == 3
+    assert again["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_processing_one_file_leaves_other_buffered_chunks_alone(tmp_path):
+    (tmp_path / "one.txt").write_text("single file")
+    manager = DocumentManager(str(tmp_path), "sk-test")
+    written = []
+
+    async def embed(texts):
+        written.extend(texts)
+        return [[0.1, 0.2] for _ in texts]
+
+    manager._get_embeddings = embed
+    manager.ingest_buffer.add("docs:queued.txt", ["queued chunk"], [{"source": "queued.txt"}], {"hash": "h"})
+
+    result = await manager.process_file(str(tmp_path / "one.txt"), "docs")
+
+    assert result == {"status": "success", "chunks_processed": 1}
+    assert written == ["single file"]
+    assert manager.ingest_buffer.texts == ["queued chunk"]
+    assert set(manager.ingest_buffer.pending_metadata) == {"docs:queued.txt"}
+    assert manager.metadata.get(f"docs:{tmp_path / 'one.txt'}")["num_chunks"] == 1
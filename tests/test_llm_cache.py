@@ -0,0 +1,55 @@
+import pytest
+
+from agentforge.utils.llm_cache import LLMCache
+
+
+def make_key(**overrides):
+    args = {
+        "provider": "openai",
+        "model_name": "gpt-4",
+        "messages": [{"role": "user", "content": "hi"}],
+        "tools": None,
+        "temperature": 0.7,
+        "stream": True,
+    }
+    args.update(overrides)
+    return LLMCache.make_key(**args)
+
+
+def test_key_ignores_dict_order_but_not_call_settings():
+    assert make_key(messages=[{"role": "user", "content": "hi"}]) == make_key(
+        messages=[{"content": "hi", "role": "user"}]
+    )
+    assert make_key() != make_key(temperature=0.2)
+    assert make_key() != make_key(max_tokens=100)
+    assert make_key() != make_key(provider="anthropic")
+
+
+@pytest.mark.asyncio
+async def test_lookup_returns_stored_chunks():
+    cache = LLMCache(max_size=2)
+    await cache.put("k", ["hello", " world"])
+
+    assert await cache.lookup("k") == ["hello", " world"]
+    assert await cache.lookup("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted():
+    cache = LLMCache(max_size=2)
+    await cache.put("a", ["1"])
+    await cache.put("b", ["2"])
+    await cache.lookup("a")
+    await cache.put("c", ["3"])
+
+    assert len(cache) == 2
+    assert await cache.lookup("b") is None
+    assert await cache.lookup("a") == ["1"]
+
+
+@pytest.mark.asyncio
+async def test_error_responses_are_not_cached():
+    cache = LLMCache()
+    await cache.put("k", ["partial", {"type": "error", "content": "boom"}])
+
+    assert await cache.lookup("k") is None
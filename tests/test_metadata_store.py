@@ -0,0 +1,86 @@
+import sqlite3
+import time
+
+from agentforge.utils.metadata_store import SqliteMetadata
+
+
+def test_file_metadata_roundtrip_and_stats(tmp_path):
+    store = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+    store.upsert_many({
+        "docs:a.pdf": {"hash": "h1", "last_processed": 1.0, "size": 10, "num_chunks": 3},
+        "docs:b.txt": {"hash": "h2", "num_chunks": 2},
+        "other:c.pdf": {"hash": "h3", "num_chunks": 1},
+    })
+    store.upsert_many({"docs:a.pdf": {"hash": "h4", "num_chunks": 5}})
+
+    assert store.get("docs:a.pdf")["hash"] == "h4"
+    assert store.get("missing") is None
+    assert "docs:b.txt" in store
+    assert len(store) == 3
+
+    stats = store.stats()
+    assert stats["total_files"] == 3
+    assert stats["total_chunks"] == 8
+    assert stats["by_assistant"]["docs"] == {"files": 2, "chunks": 7}
+    assert stats["by_type"][".pdf"] == {"files": 2, "chunks": 6}
+    store.close()
+
+
+def test_get_many_reads_metadata_for_more_keys_than_one_query_binds(tmp_path):
+    store = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+    store.upsert_many({f"docs:{i}.txt": {"hash": f"h{i}", "num_chunks": i} for i in range(1200)})
+
+    found = store.get_many([f"docs:{i}.txt" for i in range(0, 1300, 2)])
+
+    assert len(found) == 600
+    assert found["docs:1198.txt"] == store.get("docs:1198.txt")
+    assert "docs:1250.txt" not in found
+    store.close()
+
+
+def test_embeddings_roundtrip(tmp_path):
+    store = SqliteMetadata(str(tmp_path / "meta.sqlite3"))
+    store.put_embeddings({b"x": [0.5, -1.0], b"y": [2.0, 0.25]})
+
+    assert store.get_embeddings([b"x", b"y", b"z"]) == {b"x": [0.5, -1.0], b"y": [2.0, 0.25]}
+    store.close()
+
+
+def test_least_recently_used_embeddings_are_pruned(tmp_path):
+    store = SqliteMetadata(str(tmp_path / "meta.sqlite3"), max_embeddings=2)
+    store.put_embeddings({b"old": [1.0]})
+    time.sleep(0.01)
+    store.put_embeddings({b"used": [2.0]})
+    time.sleep(0.01)
+    store.get_embeddings([b"old"])
+    time.sleep(0.01)
+    store.put_embeddings({b"new": [3.0]})
+
+    assert set(store.get_embeddings([b"old", b"used", b"new"])) == {b"old", b"new"}
+    store.close()
+
+
+def test_cache_without_last_used_column_is_migrated(tmp_path):
+    db_path = str(tmp_path / "meta.sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE chunk_embeddings (chunk_hash BLOB PRIMARY KEY, embedding BLOB NOT NULL)")
+    conn.commit()
+    conn.close()
+
+    store = SqliteMetadata(db_path)
+    store.put_embeddings({b"x": [1.0]})
+
+    assert store.get_embeddings([b"x"]) == {b"x": [1.0]}
+    store.close()
+
+
+def test_migrations_are_recorded_across_opens(tmp_path):
+    db_path = str(tmp_path / "meta.sqlite3")
+    store = SqliteMetadata(db_path)
+    assert not store.has_migrated("chunk_file_ext")
+    store.mark_migrated("chunk_file_ext")
+    store.close()
+
+    store = SqliteMetadata(db_path)
+    assert store.has_migrated("chunk_file_ext")
+    store.close()
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+from agentforge.utils import model_catalog
+
+
+class FakeModels:
+    def __init__(self, ids):
+        self.ids = ids
+        self.calls = 0
+
+    async def list(self):
+        self.calls += 1
+        if self.ids is None:
+            raise ConnectionError("offline")
+        for model_id in self.ids:
+            await asyncio.sleep(0.01)
+            yield SimpleNamespace(id=model_id)
+
+
+def test_model_listing_works_on_successive_event_loops(monkeypatch, tmp_path):
+    monkeypatch.delenv("AGENTFORGE_DISABLE_REMOTE_MODELS", raising=False)
+    monkeypatch.setattr(model_catalog, "MODEL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(model_catalog, "MODEL_LIST_TTL", 0)
+    monkeypatch.setattr(model_catalog, "_model_list_cache", None)
+    clients = {"openai": SimpleNamespace(models=FakeModels(["gpt-4", "gpt-3.5-turbo"]))}
+
+    async def contend():
+        return await asyncio.gather(
+            model_catalog.list_provider_models(clients),
+            model_catalog.list_provider_models(clients)
+        )
+
+    for _ in range(2):
+        assert asyncio.run(contend()) == [{"openai": ["gpt-4", "gpt-3.5-turbo"]}] * 2
+
+
+def test_a_recent_listing_on_disk_is_reused_by_a_new_process(monkeypatch, tmp_path):
+    monkeypatch.delenv("AGENTFORGE_DISABLE_REMOTE_MODELS", raising=False)
+    monkeypatch.setattr(model_catalog, "MODEL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(model_catalog, "_model_list_cache", None)
+    models = FakeModels(["gpt-4"])
+    clients = {"openai": SimpleNamespace(models=models)}
+
+    assert asyncio.run(model_catalog.list_provider_models(clients)) == {"openai": ["gpt-4"]}
+    assert (tmp_path / "openai.json").exists() and (tmp_path / ".last_sync").exists()
+
+    # A new process starts with nothing in memory
+    monkeypatch.setattr(model_catalog, "_model_list_cache", None)
+    assert asyncio.run(model_catalog.list_provider_models(clients)) == {"openai": ["gpt-4"]}
+    assert models.calls == 1
+
+
+def test_an_expired_listing_is_kept_when_the_refresh_fails(monkeypatch, tmp_path):
+    monkeypatch.delenv("AGENTFORGE_DISABLE_REMOTE_MODELS", raising=False)
+    monkeypatch.setattr(model_catalog, "MODEL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(model_catalog, "_model_list_cache", None)
+    (tmp_path / "openai.json").write_bytes(b'["gpt-4"]')
+    models = FakeModels(None)
+
+    listed = asyncio.run(model_catalog.list_provider_models({"openai": SimpleNamespace(models=models)}))
+
+    assert listed == {"openai": ["gpt-4"]}
+    assert models.calls == 1
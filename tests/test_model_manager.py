@@ -0,0 +1,633 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+import tenacity
+
+from agentforge.utils import model_manager
+from agentforge.utils.model_manager import ModelManager, _StreamCoalescer
+
+
+async def timed(items):
+    """Yield (delay, item) pairs, sleeping before each item"""
+    for delay, item in items:
+        await asyncio.sleep(delay)
+        yield item
+
+
+async def collect(source):
+    return [item async for item in source]
+
+
+async def collect_text(source):
+    """Collect the text chunks of a stream, skipping workflow events"""
+    return [item async for item in source if isinstance(item, str)]
+
+
+@pytest.mark.asyncio
+async def test_coalescer_sends_first_delta_at_once_and_joins_the_rest():
+    coalescer = _StreamCoalescer(flush_interval=10, max_parts=3)
+    out = await collect(coalescer.coalesce(timed([(0, "a"), (0, "b"), (0, "c"), (0, "d"), (0, "e")])))
+
+    assert out == ["a", "bcd", "e"]
+
+
+@pytest.mark.asyncio
+async def test_coalescer_flushes_held_text_while_the_stream_stalls():
+    coalescer = _StreamCoalescer(flush_interval=0.02, max_parts=100)
+    loop = asyncio.get_running_loop()
+    arrivals = []
+
+    async def record():
+        async for text in coalescer.coalesce(timed([(0, "a"), (0, "b"), (0, "c"), (0.3, "d")])):
+            arrivals.append((text, loop.time()))
+
+    start = loop.time()
+    await record()
+
+    assert [text for text, _ in arrivals] == ["a", "bc", "d"]
+    # The held text went out well before the next delta arrived
+    assert arrivals[1][1] - start < 0.2
+
+
+@pytest.mark.asyncio
+async def test_coalescer_waits_idly_once_held_text_is_sent(monkeypatch):
+    waits = 0
+    wait = asyncio.wait
+
+    async def counting_wait(*args, **kwargs):
+        nonlocal waits
+        waits += 1
+        return await wait(*args, **kwargs)
+
+    monkeypatch.setattr(asyncio, "wait", counting_wait)
+    coalescer = _StreamCoalescer(flush_interval=0.01, max_parts=100)
+    out = await collect(coalescer.coalesce(timed([(0, "a"), (0, "b"), (0.3, "c")])))
+
+    assert out == ["a", "b", "c"]
+    # One wait times out to send "b"; the rest of the stall is a plain await
+    assert waits <= 2
+
+
+@pytest.mark.asyncio
+async def test_coalescer_sends_held_text_before_events():
+    coalescer = _StreamCoalescer(flush_interval=10, max_parts=100)
+    event = {"type": "tool_call", "content": {}}
+    out = await collect(coalescer.coalesce(timed([(0, "a"), (0, "b"), (0, event), (0, "c")])))
+
+    assert out == ["a", "b", event, "c"]
+
+
+def start_call_with_delays(delays, calls):
+    """Fake _start_call whose streams wait delays[provider] before each chunk"""
+    def start(provider, model_name, call_args):
+        calls.append(provider)
+        return timed([(delays[provider], f"{provider}-{i}") for i in range(2)])
+    return start
+
+
+@pytest.mark.asyncio
+async def test_hedge_after_zero_races_the_backup_at_once():
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a", hedge_after_ms=0)
+    calls = []
+    m._start_call = start_call_with_delays({"openai": 1, "anthropic": 0.01}, calls)
+
+    out = await asyncio.wait_for(
+        collect_text(m.call_with_tools("gpt-4", "openai", [{"role": "user", "content": "hi"}], raw=True)),
+        0.5
+    )
+
+    assert out == ["anthropic-0", "anthropic-1"]
+    assert calls == ["openai", "anthropic"]
+
+
+@pytest.mark.asyncio
+async def test_primary_is_kept_when_it_answers_before_the_hedge():
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a", hedge_after_ms=200)
+    calls = []
+    m._start_call = start_call_with_delays({"openai": 0.01, "anthropic": 0.01}, calls)
+
+    out = await collect_text(m.call_with_tools("gpt-4", "openai", [{"role": "user", "content": "hi"}], raw=True))
+
+    assert out == ["openai-0", "openai-1"]
+    assert calls == ["openai"]
+
+
+@pytest.mark.asyncio
+async def test_hedge_backs_up_with_the_cheapest_model_and_clamps_max_tokens():
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a", hedge_after_ms=0)
+    started = []
+
+    def start(provider, model_name, call_args):
+        started.append((model_name, call_args["max_tokens"]))
+        return timed([(1 if provider == "openai" else 0, f"{provider}-0")])
+
+    m._start_call = start
+
+    await collect_text(m.call_with_tools(
+        "gpt-4", "openai", [{"role": "user", "content": "hi"}], max_tokens=100000, raw=True
+    ))
+
+    assert started == [("gpt-4", 100000), ("claude-instant-1", model_manager.HEDGE_MAX_TOKENS)]
+
+
+@pytest.mark.asyncio
+async def test_hedge_uses_the_configured_hedge_model():
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a", hedge_after_ms=0, hedge_model="gpt-3.5-turbo")
+    started = []
+
+    def start(provider, model_name, call_args):
+        started.append(model_name)
+        return timed([(0.01, model_name)])
+
+    m._start_call = start
+
+    await collect_text(m.call_with_tools("gpt-4", "openai", [{"role": "user", "content": "hi"}], raw=True))
+
+    assert started == ["gpt-4", "gpt-3.5-turbo"]
+
+
+@pytest.mark.asyncio
+async def test_an_immediate_error_from_the_primary_waits_for_the_backup():
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a", hedge_after_ms=500)
+    error = {"type": "error", "content": "Error calling OpenAI API: boom"}
+
+    def start(provider, model_name, call_args):
+        if provider == "openai":
+            return timed([(0, error)])
+        return timed([(0.05, "backup-0"), (0, "backup-1")])
+
+    m._start_call = start
+
+    out = await collect(m.call_with_tools("gpt-4", "openai", [{"role": "user", "content": "hi"}], raw=True))
+
+    assert error not in out
+    assert [item for item in out if isinstance(item, str)] == ["backup-0", "backup-1"]
+
+
+@pytest.mark.asyncio
+async def test_the_primary_error_is_kept_when_the_backup_also_fails():
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a", hedge_after_ms=0)
+
+    def start(provider, model_name, call_args):
+        return timed([(0.01, {"type": "error", "content": provider})])
+
+    m._start_call = start
+
+    out = await collect(m.call_with_tools("gpt-4", "openai", [{"role": "user", "content": "hi"}], raw=True))
+
+    assert {"type": "error", "content": "openai"} in out
+    assert {"type": "error", "content": "anthropic"} not in out
+
+
+@pytest.mark.asyncio
+async def test_call_timeout_caps_a_slow_call():
+    m = ModelManager(openai_api_key="o", call_timeout=0.05)
+    m._start_call = start_call_with_delays({"openai": 1}, [])
+
+    with pytest.raises(asyncio.TimeoutError):
+        await collect_text(m.call_with_tools("gpt-4", "openai", [{"role": "user", "content": "hi"}], raw=True))
+
+
+class FakeAnthropicStream:
+    def __init__(self, events):
+        self.events = events
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for event in self.events:
+            yield event
+
+
+@pytest.mark.asyncio
+async def test_anthropic_stream_keeps_only_text_deltas():
+    events = [
+        SimpleNamespace(type="message_start", message=SimpleNamespace()),
+        SimpleNamespace(type="content_block_start", index=0),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text="Hi ")),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="input_json_delta", partial_json="{")),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text="there")),
+        SimpleNamespace(type="content_block_stop", index=0),
+        SimpleNamespace(type="message_delta", delta=SimpleNamespace(stop_reason="end_turn")),
+        SimpleNamespace(type="message_stop"),
+    ]
+
+    async def create(**params):
+        return FakeAnthropicStream(events)
+
+    m = ModelManager(anthropic_api_key="a", flush_interval_ms=0)
+    m.anthropic_client = SimpleNamespace(messages=SimpleNamespace(create=create))
+
+    out = await collect_text(m.call_with_tools("claude-2", messages=[{"role": "user", "content": "x"}], raw=True))
+
+    assert "".join(out) == "Hi there"
+
+
+SEARCH_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "search",
+        "description": "Search the web",
+        "parameters": {"type": "object", "properties": {"q": {"type": "string"}}}
+    }
+}
+
+
+@pytest.mark.asyncio
+async def test_anthropic_calls_send_tools_and_yield_tool_calls():
+    events = [
+        SimpleNamespace(type="content_block_start", index=0, content_block=SimpleNamespace(type="text")),
+        SimpleNamespace(type="content_block_delta", index=0, delta=SimpleNamespace(type="text_delta", text="Looking")),
+        SimpleNamespace(type="content_block_stop", index=0),
+        SimpleNamespace(
+            type="content_block_start",
+            index=1,
+            content_block=SimpleNamespace(type="tool_use", id="call_1", name="search")
+        ),
+        SimpleNamespace(type="content_block_delta", index=1, delta=SimpleNamespace(type="input_json_delta", partial_json='{"q": ')),
+        SimpleNamespace(type="content_block_delta", index=1, delta=SimpleNamespace(type="input_json_delta", partial_json='"news"}')),
+        SimpleNamespace(type="content_block_stop", index=1),
+    ]
+    sent = []
+
+    async def create(**params):
+        sent.append(params)
+        return FakeAnthropicStream(events)
+
+    m = ModelManager(anthropic_api_key="a", flush_interval_ms=0)
+    m.anthropic_client = SimpleNamespace(messages=SimpleNamespace(create=create))
+
+    out = await collect(m.call_with_tools(
+        "claude-2", messages=[{"role": "user", "content": "x"}], tools=[SEARCH_TOOL], raw=True
+    ))
+
+    assert sent[0]["tools"] == [{
+        "name": "search",
+        "description": "Search the web",
+        "input_schema": SEARCH_TOOL["function"]["parameters"]
+    }]
+    assert "Looking" in out
+    assert {
+        "type": "tool_call",
+        "tool_call": {"id": "call_1", "type": "function", "function": {"name": "search", "arguments": '{"q": "news"}'}}
+    } in out
+
+
+def test_anthropic_tool_conversion_is_reused_for_rebuilt_tool_lists():
+    m = ModelManager(anthropic_api_key="a")
+
+    first = m._convert_to_anthropic_tools([SEARCH_TOOL])
+    # Agents build a new list, with new dicts, on every call
+    rebuilt = [{"function": dict(SEARCH_TOOL["function"]), "type": "function"}]
+    assert m._convert_to_anthropic_tools(rebuilt) == first
+    assert len(m._tool_conv_cache) == 1
+
+    fetch_tool = {**SEARCH_TOOL, "function": {**SEARCH_TOOL["function"], "name": "fetch"}}
+    assert [tool["name"] for tool in m._convert_to_anthropic_tools([SEARCH_TOOL, fetch_tool])] == ["search", "fetch"]
+
+
+def test_changing_a_converted_schema_does_not_reach_later_calls():
+    m = ModelManager(anthropic_api_key="a")
+
+    first = m._convert_to_anthropic_tools([SEARCH_TOOL])
+    first[0]["input_schema"]["properties"]["q"]["type"] = "integer"
+    first[0]["input_schema"]["required"] = ["q"]
+
+    again = m._convert_to_anthropic_tools([SEARCH_TOOL])
+
+    assert again[0]["input_schema"] == {"type": "object", "properties": {"q": {"type": "string"}}}
+    assert SEARCH_TOOL["function"]["parameters"] == {"type": "object", "properties": {"q": {"type": "string"}}}
+
+
+def test_tools_already_in_anthropic_form_are_kept():
+    m = ModelManager(anthropic_api_key="a")
+    anthropic_tool = {"name": "lookup", "description": "Look up a term", "input_schema": {"type": "object"}}
+    tools = [anthropic_tool, SEARCH_TOOL, {"type": "web_search", "function": {"name": "web"}}, {"name": "bare"}]
+
+    converted = m._convert_to_anthropic_tools(tools)
+
+    assert isinstance(converted, tuple)
+    assert [tool["name"] for tool in converted] == ["lookup", "search"]
+    assert converted[0] == anthropic_tool and converted[0] is not anthropic_tool
+
+
+def test_cascade_uses_anthropic_models_without_an_openai_key():
+    m = ModelManager(anthropic_api_key="a")
+
+    tiers = m._cascade_tiers("summary", None)
+
+    assert tiers
+    assert all(provider == "anthropic" for _, provider in tiers)
+
+
+@pytest.mark.asyncio
+async def test_select_model_fast_prefers_an_active_model():
+    m = ModelManager(openai_api_key="o")
+
+    assert await m.select_model_fast("gpt-4") == ("gpt-4", "openai")
+    _, provider = await m.select_model_fast("claude-2")
+    assert provider == "openai"
+
+
+def conversation():
+    return [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "u1"},
+        {"role": "assistant", "content": "a1"},
+        {"role": "user", "content": "u2"},
+        {"role": "assistant", "content": "a2"},
+        {"role": "user", "content": "u3"},
+        {"role": "assistant", "content": "a3"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_compressed_conversation_resumes_at_a_user_turn(monkeypatch):
+    monkeypatch.setattr(model_manager, "_count_tokens", lambda model_name, text: len(text))
+    m = ModelManager(openai_api_key="o", max_input_tokens=5, keep_recent_messages=3)
+    summarized = []
+
+    async def summarize(model_name, provider, transcript):
+        summarized.append(transcript)
+        return "earlier turns"
+
+    m._summarize_with = summarize
+
+    out = await m._compress_messages(conversation(), "gpt-4")
+
+    assert out[0]["role"] == "system"
+    assert out[0]["content"].startswith("sys\n\n")
+    assert "earlier turns" in out[0]["content"]
+    # Keeping the last three would start at an assistant turn
+    assert out[1:] == conversation()[5:]
+    assert "assistant: a2" in summarized[0]
+
+
+@pytest.mark.asyncio
+async def test_conversation_is_kept_when_no_model_can_summarize(monkeypatch):
+    monkeypatch.setattr(model_manager, "_count_tokens", lambda model_name, text: len(text))
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a", max_input_tokens=5, keep_recent_messages=2)
+    tried = []
+
+    async def fail(model_name, provider, transcript):
+        tried.append(provider)
+        return None
+
+    m._summarize_with = fail
+
+    messages = conversation()
+    assert await m._compress_messages(messages, "gpt-4") == messages
+    assert {"openai", "anthropic"} <= set(tried)
+
+
+@pytest.mark.asyncio
+async def test_closing_one_manager_leaves_the_shared_pool_open():
+    pool = model_manager.get_http_client()
+
+    async with ModelManager(openai_api_key="o"):
+        pass
+
+    assert not pool.is_closed
+    assert model_manager.get_http_client() is pool
+    await model_manager.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_managers_pick_up_new_clients_after_the_pool_is_closed():
+    m = ModelManager(openai_api_key="o")
+    first = m.openai_client
+    first_pool = first._client
+
+    await model_manager.close_http_client()
+
+    assert first_pool.is_closed
+    assert m.openai_client is not first
+    assert m.openai_client._client is model_manager.get_http_client()
+    await model_manager.close_http_client()
+
+
+def test_each_event_loop_gets_its_own_pool_and_clients():
+    async def clients():
+        m = ModelManager(openai_api_key="o")
+        return m.openai_client, model_manager.get_http_client()
+
+    first_client, first_pool = asyncio.run(clients())
+    second_client, second_pool = asyncio.run(clients())
+
+    assert second_pool is not first_pool
+    assert second_client is not first_client
+    assert second_client._client is second_pool
+
+
+def test_provider_limits_work_on_successive_event_loops(monkeypatch):
+    monkeypatch.setitem(model_manager.PROVIDER_CONCURRENCY, "openai", 1)
+
+    async def contend():
+        semaphore, limiter = model_manager.get_provider_limits("openai")
+
+        async def hold():
+            async with limiter, semaphore:
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(hold(), hold())
+
+    asyncio.run(contend())
+    asyncio.run(contend())
+
+
+class FakeOpenAIBatches:
+    """OpenAI files and batches endpoints answering from canned output lines"""
+
+    def __init__(self, output_lines):
+        self.output_lines = output_lines
+        self.uploaded = None
+        self.statuses = ["validating", "in_progress", "completed"]
+
+    async def create_file(self, file, purpose):
+        self.uploaded = file[1]
+        return SimpleNamespace(id="file-in")
+
+    async def create(self, **params):
+        return SimpleNamespace(id="batch-1", status="validating", output_file_id=None)
+
+    async def retrieve(self, batch_id):
+        status = self.statuses.pop(0)
+        return SimpleNamespace(id=batch_id, status=status, output_file_id="file-out" if status == "completed" else None)
+
+    async def content(self, file_id):
+        return SimpleNamespace(content=b"\n".join(self.output_lines))
+
+
+@pytest.mark.asyncio
+async def test_run_batch_returns_openai_outputs_in_request_order(monkeypatch):
+    monkeypatch.setattr(model_manager, "BATCH_POLL_INTERVAL", 0)
+    batches = FakeOpenAIBatches([
+        b'{"custom_id": "1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "two"}}]}}}',
+        b'{"custom_id": "0", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "one"}}]}}}',
+        b'{"custom_id": "2", "response": {"status_code": 500, "body": {}}}',
+    ])
+    m = ModelManager(openai_api_key="o")
+    m.openai_client = SimpleNamespace(
+        files=SimpleNamespace(create=batches.create_file, content=batches.content),
+        batches=batches
+    )
+
+    out = await m.run_batch("gpt-4", [
+        {"messages": [{"role": "user", "content": str(i)}], "max_tokens": 5} for i in range(3)
+    ])
+
+    assert out == ["one", "two", None]
+    uploaded = [model_manager.orjson.loads(line) for line in batches.uploaded.splitlines()]
+    assert [line["custom_id"] for line in uploaded] == ["0", "1", "2"]
+    assert uploaded[0]["body"]["max_tokens"] == 5 and "stream" not in uploaded[0]["body"]
+    assert batches.statuses == []
+
+
+@pytest.mark.asyncio
+async def test_run_batch_collects_succeeded_anthropic_results(monkeypatch):
+    monkeypatch.setattr(model_manager, "BATCH_POLL_INTERVAL", 0)
+    submitted = []
+    statuses = ["in_progress", "ended"]
+
+    def result(custom_id, kind, text=""):
+        message = SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+        return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type=kind, message=message))
+
+    async def create(requests):
+        submitted.extend(requests)
+        return SimpleNamespace(id="msgbatch-1")
+
+    async def retrieve(batch_id):
+        return SimpleNamespace(id=batch_id, processing_status=statuses.pop(0))
+
+    async def results(batch_id):
+        return FakeAnthropicStream([result("1", "succeeded", "b"), result("0", "errored")])
+
+    m = ModelManager(anthropic_api_key="a")
+    m.anthropic_client = SimpleNamespace(messages=SimpleNamespace(
+        batches=SimpleNamespace(create=create, retrieve=retrieve, results=results)
+    ))
+
+    out = await m.run_batch("claude-2", [{"messages": [{"role": "user", "content": "x"}]}] * 2)
+
+    assert out == [None, "b"]
+    assert [request["custom_id"] for request in submitted] == ["0", "1"]
+    assert "stream" not in submitted[0]["params"]
+
+
+def openai_error(error_class, status, code):
+    response = httpx.Response(status, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return error_class("error", response=response, body={"code": code, "message": "error"})
+
+
+@pytest.mark.asyncio
+async def test_a_missing_openai_model_is_retried_once_with_the_fallback():
+    m = ModelManager(openai_api_key="o", openai_fallback_model="gpt-4o-mini")
+    requested = []
+
+    async def create(params):
+        requested.append(params["model"])
+        if params["model"] != "gpt-4o-mini":
+            raise openai_error(model_manager.NotFoundError, 404, "model_not_found")
+        return "completion"
+
+    m._openai_create = create
+
+    assert await m._create_openai_completion({"model": "gpt-5-preview", "messages": []}) == "completion"
+    assert requested == ["gpt-5-preview", "gpt-4o-mini"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fallback, code", [("gpt-4o-mini", "invalid_request_error"), (None, "model_not_found")])
+async def test_other_openai_errors_are_not_retried_with_the_fallback(fallback, code):
+    m = ModelManager(openai_api_key="o", openai_fallback_model=fallback)
+    requested = []
+
+    async def create(params):
+        requested.append(params["model"])
+        raise openai_error(model_manager.BadRequestError, 400, code)
+
+    m._openai_create = create
+
+    with pytest.raises(model_manager.BadRequestError):
+        await m._create_openai_completion({"model": "gpt-4", "messages": []})
+    assert requested == ["gpt-4"]
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    async def acquire(self):
+        self.acquired += 1
+
+
+def failing_openai_client(errors, requested):
+    """OpenAI client whose completions raise the given errors, then succeed"""
+    async def create(**params):
+        requested.append(params["model"])
+        if errors:
+            raise errors.pop(0)
+        return "completion"
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@pytest.fixture
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(ModelManager._openai_create.retry, "wait", tenacity.wait_none())
+    limiter = CountingLimiter()
+    monkeypatch.setattr(model_manager, "get_provider_limits", lambda provider: (None, limiter))
+    return limiter
+
+
+@pytest.mark.asyncio
+async def test_transient_openai_errors_are_retried_with_a_rate_limit_slot_each(no_retry_wait):
+    requested = []
+    m = ModelManager(openai_api_key="o")
+    m.openai_client = failing_openai_client([
+        openai_error(openai.RateLimitError, 429, "rate_limit_exceeded"),
+        openai_error(openai.InternalServerError, 503, "overloaded"),
+    ], requested)
+
+    assert await m._openai_create({"model": "gpt-4", "messages": []}) == "completion"
+    assert requested == ["gpt-4"] * 3
+    assert no_retry_wait.acquired == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_the_attempt_limit(no_retry_wait):
+    requested = []
+    m = ModelManager(openai_api_key="o")
+    m.openai_client = failing_openai_client([
+        openai_error(openai.RateLimitError, 429, "rate_limit_exceeded")
+        for _ in range(model_manager.PROVIDER_MAX_ATTEMPTS + 1)
+    ], requested)
+
+    with pytest.raises(openai.RateLimitError):
+        await m._openai_create({"model": "gpt-4", "messages": []})
+    assert len(requested) == model_manager.PROVIDER_MAX_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_request_errors_are_not_retried(no_retry_wait):
+    requested = []
+    m = ModelManager(openai_api_key="o")
+    m.openai_client = failing_openai_client([openai_error(openai.BadRequestError, 400, "invalid_request_error")], requested)
+
+    with pytest.raises(openai.BadRequestError):
+        await m._openai_create({"model": "gpt-4", "messages": []})
+    assert requested == ["gpt-4"]
+
+
+@pytest.mark.asyncio
+async def test_shared_sdk_clients_leave_retries_to_the_manager():
+    m = ModelManager(openai_api_key="o", anthropic_api_key="a")
+
+    assert m.openai_client.max_retries == 0
+    assert m.anthropic_client.max_retries == 0
+    await model_manager.close_http_client()
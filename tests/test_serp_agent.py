@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agentforge.agents import serp_agent
+from agentforge.agents.serp_agent import SerpAgent
+
+
+@pytest.mark.asyncio
+async def test_stopping_iter_search_early_waits_for_cancelled_searches():
+    agent = SerpAgent.__new__(SerpAgent)
+    cancelled = []
+
+    async def search(query, weight, semaphore):
+        if query == "fast":
+            return {"query": query}
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+
+    agent._weighted_search = search
+    results = agent.iter_search([("fast", 1.0), ("slow", 1.0), ("slower", 1.0)])
+
+    assert await results.__anext__() == {"query": "fast"}
+    await results.aclose()
+
+    # The searches are cancelled and finished by the time aclose returns
+    assert sorted(cancelled) == ["slow", "slower"]
+
+
+class FakeBody:
+    """Streamed response body that counts the chunks read from it"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+def fake_response(chunks, content_length=None):
+    return SimpleNamespace(content=FakeBody(chunks), content_length=content_length, status=200)
+
+
+@pytest.mark.asyncio
+async def test_read_capped_returns_bodies_within_the_limit():
+    response = fake_response([b"ab", b"cd"])
+
+    assert await SerpAgent._read_capped(response, 4) == b"abcd"
+
+
+@pytest.mark.asyncio
+async def test_read_capped_rejects_a_declared_oversize_body_without_reading_it():
+    response = fake_response([b"x" * 10], content_length=serp_agent.SERPAPI_MAX_BYTES + 1)
+
+    with pytest.raises(ValueError):
+        await SerpAgent._read_capped(response, serp_agent.SERPAPI_MAX_BYTES)
+    assert response.content.read == 0
+
+
+@pytest.mark.asyncio
+async def test_read_capped_stops_reading_once_the_limit_is_passed():
+    megabyte = b"x" * (1024 * 1024)
+    response = fake_response([megabyte] * 10)
+
+    with pytest.raises(ValueError):
+        await SerpAgent._read_capped(response, serp_agent.SERPAPI_MAX_BYTES)
+    # 4 MiB cap: the fifth megabyte passes it and nothing more is read
+    assert response.content.read == 5
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agentforge.agents.web_search_agent import WebSearchAgent
+
+
+@pytest.mark.asyncio
+async def test_search_queries_are_split_from_the_whole_response():
+    async def call_with_tools(**kwargs):
+        # Coalesced chunks cut through one query and join two lines
+        for chunk in ["latest rust rel", "ease\nrust 2024 edi", "tion changes\n"]:
+            yield chunk
+
+    agent = WebSearchAgent.__new__(WebSearchAgent)
+    agent.model_manager = SimpleNamespace(call_with_tools=call_with_tools)
+    searched = []
+
+    async def search_and_analyze(query):
+        searched.append(query)
+        return ""
+
+    agent.search_and_analyze = search_and_analyze
+
+    async for _ in agent.stream_process("rust news"):
+        pass
+
+    assert searched == ["latest rust release", "rust 2024 edition changes"]